@@ -0,0 +1,402 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+Benchmarks of pyioc resolution hot paths.
+
+Every benchmark is a setup function returning a callable without arguments whose execution time is measured.
+Import benchmarks measure the time of importing a module in a fresh interpreter, and memory benchmarks measure
+the memory allocated per registration (Python 3 only).
+Results are printed as a table, and optionally written as JSON so they can be compared between releases.
+
+Usage:
+    python bin/benchmark.py [--filter NAME] [--number N] [--repeat R] [--import-repeat R] [--count N]
+                            [--output results.json]
+"""
+from __future__ import absolute_import, print_function
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+from collections import OrderedDict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pyioc.containers import SimpleContainer, NamespacedContainer, InstanceLifetime
+import pyioc.providers as providers
+
+BENCHMARKS = OrderedDict()
+
+IMPORT_BENCHMARKS = OrderedDict([
+    ('import.containers', 'pyioc.containers'),
+    ('import.aio', 'pyioc.aio'),
+])
+
+MEMORY_BENCHMARKS = OrderedDict()
+
+IMPORT_CODE = 'from timeit import default_timer; start = default_timer(); import %s; print(default_timer() - start)'
+
+DEPTH = 10
+WIDTH = 20
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def memory_benchmark(name):
+    def register(setup):
+        MEMORY_BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+class Leaf(object):
+    pass
+
+
+class Node(object):
+    def __init__(self, child):
+        self.child = child
+
+
+def _make_wide_class(width):
+    args = ', '.join('dep%d' % i for i in range(width))
+    namespace = {}
+    exec('def __init__(self, %s):\n    pass\n' % args, namespace)
+    return type('Wide', (object,), {'__init__': namespace['__init__']})
+
+
+def _register_deep_graph(container, depth, lifetime):
+    container.register_callable('child', Leaf, lifetime=lifetime)
+    for level in range(1, depth):
+        func = _make_level(level)
+        container.register_callable_with_deps('level%d' % level, func, lifetime=lifetime)
+    return 'level%d' % (depth - 1)
+
+
+def _make_level(level):
+    child_key = 'level%d' % (level - 1) if level > 1 else 'child'
+    namespace = {'Node': Node}
+    exec('def level(%s):\n    return Node(%s)\n' % (child_key, child_key), namespace)
+    return namespace['level']
+
+
+def _register_wide_graph(container, width):
+    for i in range(width):
+        container.register_callable('dep%d' % i, Leaf)
+    container.register_callable_with_deps('wide', _make_wide_class(width))
+
+
+@benchmark('simple.resolve.object')
+def _simple_resolve_object():
+    container = SimpleContainer()
+    container.register_object('key', Leaf())
+    return lambda: container.resolve('key')
+
+
+@benchmark('simple.resolve.per_call')
+def _simple_resolve_per_call():
+    container = SimpleContainer()
+    container.register_callable('key', Leaf)
+    return lambda: container.resolve('key')
+
+
+@benchmark('simple.resolve.singleton')
+def _simple_resolve_singleton():
+    container = SimpleContainer()
+    container.register_callable('key', Leaf, lifetime=InstanceLifetime.Singleton)
+    return lambda: container.resolve('key')
+
+
+@benchmark('simple.resolve.deep.per_call')
+def _simple_resolve_deep_per_call():
+    container = SimpleContainer()
+    key = _register_deep_graph(container, DEPTH, InstanceLifetime.NewInstancePerCall)
+    return lambda: container.resolve(key)
+
+
+@benchmark('simple.resolve.deep.singleton')
+def _simple_resolve_deep_singleton():
+    container = SimpleContainer()
+    key = _register_deep_graph(container, DEPTH, InstanceLifetime.Singleton)
+    return lambda: container.resolve(key)
+
+
+@benchmark('simple.resolve.wide.per_call')
+def _simple_resolve_wide():
+    container = SimpleContainer()
+    _register_wide_graph(container, WIDTH)
+    return lambda: container.resolve('wide')
+
+
+@benchmark('simple.resolve.deep.context')
+def _simple_resolve_deep_context():
+    container = SimpleContainer()
+    key = _register_deep_graph(container, DEPTH, InstanceLifetime.NewInstancePerCall)
+    context = {'child': Leaf()}
+    return lambda: container.resolve(key, context)
+
+
+@benchmark('simple.resolve.wide.context')
+def _simple_resolve_wide_context():
+    container = SimpleContainer()
+    _register_wide_graph(container, WIDTH)
+    container.register_callable_with_deps('root', lambda wide, level1: (wide, level1))
+    _register_deep_graph(container, DEPTH, InstanceLifetime.Singleton)
+    context = {'dep0': Leaf()}
+    return lambda: container.resolve('root', context)
+
+
+@benchmark('simple.resolve_many.wide')
+def _simple_resolve_many_wide():
+    container = SimpleContainer()
+    _register_wide_graph(container, WIDTH)
+    keys = ['dep%d' % i for i in range(WIDTH)]
+    return lambda: container.resolve_many(keys)
+
+
+@benchmark('simple.resolve_all.singletons')
+def _simple_resolve_all_singletons():
+    container = SimpleContainer()
+    for i in range(100):
+        container.register_callable('plugins', Leaf, lifetime=InstanceLifetime.Singleton, multiple=True)
+    return lambda: container.resolve_all('plugins')
+
+
+@benchmark('codegen.resolve.deep.per_call')
+def _codegen_resolve_deep_per_call():
+    container = SimpleContainer(codegen=True)
+    key = _register_deep_graph(container, DEPTH, InstanceLifetime.NewInstancePerCall)
+    return lambda: container.resolve(key)
+
+
+@benchmark('codegen.resolve.wide.per_call')
+def _codegen_resolve_wide():
+    container = SimpleContainer(codegen=True)
+    _register_wide_graph(container, WIDTH)
+    return lambda: container.resolve('wide')
+
+
+@benchmark('codegen.resolve.small')
+def _codegen_small():
+    container = SimpleContainer(codegen=True)
+    _register_wide_graph(container, 2)
+    return lambda: container.resolve('wide')
+
+
+@benchmark('simple.resolve.small')
+def _simple_small():
+    container = SimpleContainer()
+    _register_wide_graph(container, 2)
+    return lambda: container.resolve('wide')
+
+
+@benchmark('frozen.resolve.deep.per_call')
+def _frozen_resolve_deep_per_call():
+    container = SimpleContainer()
+    key = _register_deep_graph(container, DEPTH, InstanceLifetime.NewInstancePerCall)
+    frozen = container.freeze()
+    return lambda: frozen.resolve(key)
+
+
+@benchmark('simple.build')
+def _simple_build():
+    container = SimpleContainer()
+    _register_wide_graph(container, 2)
+    cls = _make_wide_class(2)
+    return lambda: container.build(cls)
+
+
+@benchmark('simple.scope.resolve.deep')
+def _simple_scope_resolve_deep():
+    container = SimpleContainer()
+    key = _register_deep_graph(container, DEPTH, InstanceLifetime.Scoped)
+
+    def resolve():
+        with container.create_scope() as scope:
+            return scope.resolve(key)
+
+    return resolve
+
+
+@benchmark('namespaced.resolve.own')
+def _namespaced_resolve_own():
+    container = NamespacedContainer('root')
+    container.register_callable('key', Leaf)
+    return lambda: container.resolve('key')
+
+
+@benchmark('namespaced.resolve.sub')
+def _namespaced_resolve_sub():
+    container = NamespacedContainer('root')
+    sub_container = SimpleContainer('sub')
+    sub_container.register_callable('key', Leaf)
+    container.add_sub_container(sub_container)
+    return lambda: container.resolve('sub__key')
+
+
+@benchmark('namespaced.resolve.sub.context')
+def _namespaced_resolve_sub_context():
+    container = NamespacedContainer('root')
+    sub_container = SimpleContainer('sub')
+    sub_container.register_callable('key', Leaf)
+    container.add_sub_container(sub_container)
+    context = {'other': Leaf()}
+    return lambda: container.resolve('sub__key', context)
+
+
+@benchmark('namespaced.resolve.deep.per_call')
+def _namespaced_resolve_deep():
+    container = NamespacedContainer('root')
+    key = _register_deep_graph(container, DEPTH, InstanceLifetime.NewInstancePerCall)
+    return lambda: container.resolve(key)
+
+
+@benchmark('provider.with_deps.per_call')
+def _provider_with_deps():
+    container = SimpleContainer()
+    _register_wide_graph(container, 2)
+    provider = providers.NewInstancesWithDepsProvider(_make_wide_class(2), container)
+    return provider.get_instance
+
+
+@benchmark('provider.with_deps.singleton')
+def _provider_with_deps_singleton():
+    container = SimpleContainer()
+    _register_wide_graph(container, 2)
+    provider = providers.LazySingleInstanceWithDepsProvider(_make_wide_class(2), container)
+    return provider.get_instance
+
+
+@memory_benchmark('memory.register_callable')
+def _memory_register_callable(keys):
+    container = SimpleContainer()
+    for key in keys:
+        container.register_callable(key, Leaf)
+    return container
+
+
+@memory_benchmark('memory.register_callable.singleton')
+def _memory_register_singleton(keys):
+    container = SimpleContainer()
+    for key in keys:
+        container.register_callable(key, Leaf, lifetime=InstanceLifetime.Singleton)
+    return container
+
+
+@memory_benchmark('memory.register_callable_with_deps')
+def _memory_register_with_deps(keys):
+    container = SimpleContainer()
+    container.register_callable('child', Leaf)
+    for key in keys:
+        container.register_callable_with_deps(key, Node)
+    return container
+
+
+@memory_benchmark('memory.child_container')
+def _memory_child_container(keys):
+    container = SimpleContainer()
+    container.register_object('key', Leaf())
+    children = [container.create_child() for _ in keys]
+    for child in children:
+        child.register_object('key', Leaf())
+    return container, children
+
+
+def run(names, number, repeat):
+    results = OrderedDict()
+    for name in names:
+        func = BENCHMARKS[name]()
+        func()
+        timings = sorted(timeit.repeat(func, number=number, repeat=repeat))
+        results[name] = OrderedDict([
+            ('min_ns', timings[0] / number * 1e9),
+            ('median_ns', timings[len(timings) // 2] / number * 1e9),
+            ('number', number),
+            ('repeat', repeat),
+        ])
+    return results
+
+
+def run_imports(names, repeat):
+    results = OrderedDict()
+    for name in names:
+        code = IMPORT_CODE % IMPORT_BENCHMARKS[name]
+        timings = sorted(float(subprocess.check_output([sys.executable, '-c', code], cwd=ROOT))
+                         for _ in range(repeat))
+        results[name] = OrderedDict([
+            ('min_ns', timings[0] * 1e9),
+            ('median_ns', timings[len(timings) // 2] * 1e9),
+            ('number', 1),
+            ('repeat', repeat),
+        ])
+    return results
+
+
+def run_memory(names, count):
+    import tracemalloc
+
+    results = OrderedDict()
+    keys = ['key%d' % i for i in range(count)]
+    for name in names:
+        tracemalloc.start()
+        try:
+            start = tracemalloc.get_traced_memory()[0]
+            registrations = MEMORY_BENCHMARKS[name](keys)
+            allocated = tracemalloc.get_traced_memory()[0] - start
+        finally:
+            tracemalloc.stop()
+        del registrations
+        results[name] = OrderedDict([
+            ('bytes_per_item', float(allocated) / count),
+            ('count', count),
+        ])
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run pyioc benchmarks.')
+    parser.add_argument('--filter', default='', help='Run only benchmarks with names containing this string.')
+    parser.add_argument('--number', type=int, default=10000, help='Number of calls in a single measurement.')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of measurements.')
+    parser.add_argument('--import-repeat', type=int, default=20, help='Number of measured imports.')
+    parser.add_argument('--count', type=int, default=10000, help='Number of registrations in memory benchmarks.')
+    parser.add_argument('--output', help='Path of the JSON file to write the results to.')
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    results = run(names, args.number, args.repeat)
+    import_names = [name for name in IMPORT_BENCHMARKS if args.filter in name]
+    results.update(run_imports(import_names, args.import_repeat))
+    if sys.version_info >= (3, 4):
+        results.update(run_memory([name for name in MEMORY_BENCHMARKS if args.filter in name], args.count))
+
+    for name, result in results.items():
+        if 'bytes_per_item' in result:
+            print('%-40s %12.1f B' % (name, result['bytes_per_item']))
+        else:
+            print('%-40s %12.1f ns %12.1f ns' % (name, result['min_ns'], result['median_ns']))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(OrderedDict([
+                ('python', platform.python_version()),
+                ('implementation', platform.python_implementation()),
+                ('benchmarks', results),
+            ]), f, indent=2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
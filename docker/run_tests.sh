@@ -6,7 +6,7 @@ FILE_PATH=$(readlink -f ${BASH_SOURCE[0]})
 FILE_DIR=$(dirname ${FILE_PATH})
 SRC_DIR=$(dirname ${FILE_DIR})
 
-for PY_VER in 2.6 2.7 3.3 3.4 3.5 3.6
+for PY_VER in 2.7 3.3 3.4 3.5 3.6
 do
     docker run -it \
     -v ${SRC_DIR}:/code \
@@ -0,0 +1,38 @@
+# coding=utf-8
+"""
+Python 2 compatibility layer. On Python 3 nothing is imported from *six* and *future*, which are slow to import,
+so importing pyioc stays fast in short-lived processes.
+"""
+from __future__ import absolute_import
+
+import sys
+
+PY2 = sys.version_info[0] == 2
+PY3 = not PY2
+
+if PY2:
+    from future.standard_library import install_aliases
+    from future.utils import iteritems
+    from six import add_metaclass
+
+    install_aliases()
+else:
+    def iteritems(d):
+        return iter(d.items())
+
+    def add_metaclass(metaclass):
+        """
+        Class decorator creating the class with a given metaclass (same as six.add_metaclass).
+        """
+
+        def wrapper(cls):
+            namespace = cls.__dict__.copy()
+            slots = namespace.get('__slots__')
+            if slots is not None:
+                for slot in ([slots] if isinstance(slots, str) else slots):
+                    namespace.pop(slot)
+            namespace.pop('__dict__', None)
+            namespace.pop('__weakref__', None)
+            return metaclass(cls.__name__, cls.__bases__, namespace)
+
+        return wrapper
@@ -0,0 +1,262 @@
+# coding=utf-8
+"""
+Module containing asyncio support - providers for coroutine factories and asynchronous resolution of objects.
+Requires Python 3.5 or newer, so it is imported by the containers only when needed.
+"""
+import asyncio
+import inspect
+from timeit import default_timer
+
+import pyioc.providers as providers
+from pyioc.containers import DisposalTimeoutError, AsyncResolutionError
+from pyioc.providers import _NOT_CREATED
+
+
+def _raise_not_created(callable_object):
+    raise AsyncResolutionError('Object created by coroutine function "%s" can only be resolved with resolve_async()' %
+                               getattr(callable_object, '__name__', callable_object))
+
+
+class _AsyncSingletonMixin(object):
+    """
+    Stores the instance created by the coroutine returned from _create(). Concurrent first-time calls are coalesced
+    onto a single task, and failed creation is retried on the next call. Once the instance is created, it is returned
+    by the synchronous get_instance() too.
+    """
+    __slots__ = ()
+    is_async = True
+
+    def get_instance(self, context=None):
+        instance = self._instance
+        if instance is _NOT_CREATED:
+            _raise_not_created(self._callable_object)
+        return instance
+
+    def get_factory(self):
+        return self.get_instance
+
+    async def get_instance_async(self, context=None):
+        instance = self._instance
+        if instance is not _NOT_CREATED:
+            return instance
+
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._create_and_store(context))
+
+        return await asyncio.shield(self._task)
+
+    def release(self):
+        instance = super(_AsyncSingletonMixin, self).release()
+        self._task = None
+        return instance
+
+    async def _create_and_store(self, context):
+        try:
+            instance = await self._create(context)
+        except BaseException:
+            self._task = None
+            raise
+
+        return self._store_instance(instance)
+
+
+class AsyncNewInstancesProvider(providers.NewInstancesProvider):
+    __slots__ = ()
+    is_async = True
+
+    def get_instance(self, context=None):
+        _raise_not_created(self._callable_object)
+
+    def get_factory(self):
+        return self.get_instance
+
+    async def get_instance_async(self, context=None):
+        return await self._callable_object()
+
+
+class AsyncLazySingleInstanceProvider(_AsyncSingletonMixin, providers.LazySingleInstanceProvider):
+    __slots__ = ('_task',)
+
+    def __init__(self, callable_object):
+        super(AsyncLazySingleInstanceProvider, self).__init__(callable_object)
+        self._task = None
+
+    async def _create(self, context):
+        return await self._callable_object()
+
+
+class AsyncNewInstancesWithDepsProvider(providers.NewInstancesWithDepsProvider):
+    __slots__ = ()
+    is_async = True
+
+    def get_instance(self, context=None):
+        _raise_not_created(self._callable_object)
+
+    def get_factory(self):
+        return self.get_instance
+
+    async def get_instance_async(self, context=None):
+        args, kwargs = await resolve_dependencies(self, context)
+        return await self._callable_object(*args, **kwargs)
+
+
+class AsyncLazySingleInstanceWithDepsProvider(_AsyncSingletonMixin, providers.LazySingleInstanceWithDepsProvider):
+    __slots__ = ('_task',)
+
+    def __init__(self, callable_object, container):
+        super(AsyncLazySingleInstanceWithDepsProvider, self).__init__(callable_object, container)
+        self._task = None
+
+    async def _create(self, context):
+        args, kwargs = await resolve_dependencies(self, context)
+        return await self._callable_object(*args, **kwargs)
+
+
+async def resolve(container, key, context=None):
+    """
+    Resolves the object registered for a given key, awaiting coroutine factories on the way.
+
+    :param container: Container in which the key is registered.
+    :param key: Key under which the object or callable was registered.
+    :param context: Dictionary of objects overriding registrations.
+    :return: Instance related to that key.
+    """
+    if context:
+        try:
+            return context[container._context_key(key)]
+        except KeyError:
+            pass
+
+    provider = container._find_provider(key)
+    if provider is None:
+        return container.resolve(key, context)
+
+    return await get_instance(provider, context)
+
+
+async def resolve_profiled(container, key, context=None):
+    """
+    Version of resolve() calling profiling hooks of the container around getting the instance. Containers use it
+    in place of resolve() while profiling is enabled.
+    """
+    if context:
+        try:
+            return context[container._context_key(key)]
+        except KeyError:
+            pass
+
+    provider = container._find_provider(key)
+    if provider is None:
+        return container.resolve(key, context)
+
+    hooks = container._hooks
+    hooks.before_get_instance(key, provider)
+    start = default_timer()
+    try:
+        return await get_instance(provider, context)
+    finally:
+        hooks.after_get_instance(key, provider, default_timer() - start)
+
+
+async def build(container, cls, context=None):
+    """
+    Builds a new instance of cls (or awaits a coroutine function) with dependencies resolved asynchronously.
+    """
+    if providers.is_coroutine_function(cls):
+        provider = AsyncNewInstancesWithDepsProvider(cls, container)
+    else:
+        provider = providers.NewInstancesWithDepsProvider(cls, container)
+
+    return await get_instance(provider, context)
+
+
+async def get_instance(provider, context=None):
+    """
+    Gets instance from any provider. Dependencies of synchronous providers with dependencies are resolved
+    asynchronously too, so they may depend on objects created by coroutines.
+    """
+    if provider.is_async:
+        return await provider.get_instance_async(context)
+
+    if isinstance(provider, providers.ScopedWithDepsProvider):
+        return provider.get_instance(context)
+
+    if isinstance(provider, providers.NewInstancesWithDepsProvider):
+        if getattr(provider, 'is_created', False):
+            return provider.get_instance(context)
+
+        args, kwargs = await resolve_dependencies(provider, context)
+        return provider.create_instance(args, kwargs)
+
+    return provider.get_instance(context)
+
+
+async def resolve_dependencies(provider, context=None):
+    """
+    Resolves all dependencies of the provider concurrently.
+
+    :return: Tuple of args list and kwargs dictionary for the callable of the provider.
+    """
+    container = provider.container
+    selected = provider.plan.select(container, context)
+    if not selected:
+        return (), {}
+
+    # dependencies are resolved through the container, so they are profiled when profiling of it is enabled
+    resolve_async = container.resolve_async
+    values = await asyncio.gather(*[resolve_async(key, context) for key, keyword in selected])
+    return provider.plan.split(selected, values)
+
+
+async def dispose(released, timeout=None):
+    """
+    Closes released singletons concurrently, each one after all instances depending on it were closed.
+
+    :param released: Dictionary of (key, instance, providers of instances depending on it) by provider, as returned
+        by SimpleContainer._release_singletons().
+    :param timeout: Seconds to wait for closing of a single instance.
+    :raises DisposalTimeoutError: When closing of an instance didn't finish in time.
+    """
+    tasks = {}
+    for provider, (key, instance, dependents) in released.items():
+        tasks[provider] = asyncio.ensure_future(_dispose_after(tasks, dependents, key, instance, timeout))
+
+    results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+
+async def _dispose_after(tasks, dependents, key, instance, timeout):
+    # all tasks are created before the first one starts, so they can be looked up here
+    waiting = [tasks[provider] for provider in dependents]
+    if waiting:
+        await asyncio.wait(waiting)
+
+    try:
+        await asyncio.wait_for(_dispose_instance(instance), timeout)
+    except asyncio.TimeoutError:
+        raise DisposalTimeoutError('Closing of "%s" did not finish in %s seconds' % (key, timeout))
+
+
+async def _dispose_instance(instance):
+    aclose = getattr(instance, 'aclose', None)
+    if callable(aclose):
+        await aclose()
+        return
+
+    aexit = getattr(instance, '__aexit__', None)
+    if callable(aexit):
+        await aexit(None, None, None)
+        return
+
+    close = getattr(instance, 'close', None)
+    if callable(close):
+        result = close()
+        if inspect.isawaitable(result):
+            await result
+        return
+
+    exit_ = getattr(instance, '__exit__', None)
+    if callable(exit_):
+        exit_(None, None, None)
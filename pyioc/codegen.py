@@ -0,0 +1,88 @@
+# coding=utf-8
+"""
+Module generating source code of factory functions. A generated factory creates the whole graph of objects created
+per call in a single expression, e.g. ``c0(c1(), c2(o0))``, instead of calling a closure for every dependency.
+See the *codegen* argument of SimpleContainer.
+"""
+from __future__ import absolute_import
+
+import pyioc.providers as providers
+
+MAX_INLINED_CALLS = 32
+"""
+Maximal number of calls inlined into a single generated factory. Deeper dependencies are created by their own factories.
+"""
+
+
+class _FactoryWriter(object):
+    def __init__(self):
+        self.namespace = {}
+        self.calls = 0
+        self._names = {}
+
+    def name(self, prefix, value):
+        # every value is bound to the namespace of the generated function once
+        try:
+            return self._names[id(value)][0]
+        except KeyError:
+            name = '%s%d' % (prefix, len(self._names))
+            self._names[id(value)] = (name, value)
+            self.namespace[name] = value
+            return name
+
+    def expression(self, container, key, provider, visiting):
+        if type(provider) is providers.ObjectProvider:
+            return self.name('o', provider.get_instance())
+
+        if self.calls < MAX_INLINED_CALLS and provider not in visiting:
+            if type(provider) is providers.NewInstancesProvider:
+                self.calls += 1
+                return '%s()' % self.name('c', provider.callable_object)
+
+            if type(provider) is providers.NewInstancesWithDepsProvider:
+                self.calls += 1
+                visiting.add(provider)
+                try:
+                    return '%s(%s)' % (self.name('c', provider.callable_object),
+                                       self.arguments(provider.container, provider.plan, visiting))
+                finally:
+                    visiting.discard(provider)
+
+        return '%s()' % self.name('f', container.get_factory(key))
+
+    def arguments(self, container, plan, visiting):
+        selected = plan.select(container)
+        arguments = []
+        for key, keyword in selected:
+            provider = container._find_provider(key)
+            if provider is None:
+                expression = '%s()' % self.name('f', container.get_factory(key))
+            else:
+                expression = self.expression(container, key, provider, visiting)
+            arguments.append(expression if keyword is None else '%s=%s' % (keyword, expression))
+
+        # positional arguments precede keyword ones, so the indices of skipped positional-only defaults still apply
+        for index, value in getattr(selected, 'defaults', ()):
+            arguments.insert(index, self.name('o', value))
+        return ', '.join(arguments)
+
+
+def generate_factory(container, key, provider):
+    """
+    Generates a factory function for the provider with dependencies registered under the key. Objects created per
+    call are inlined into the factory, all other dependencies are created by factories compiled by their containers.
+
+    :param container: Container in which the provider is registered.
+    :param key: Key under which the provider is registered.
+    :param provider: Provider registered under the key.
+    :return: Generated function without arguments, or None when the provider is not supported.
+    """
+    if type(provider) is not providers.NewInstancesWithDepsProvider:
+        return None
+
+    writer = _FactoryWriter()
+    expression = writer.expression(container, key, provider, set())
+
+    source = 'def factory():\n    return %s\n' % expression
+    exec(compile(source, '<pyioc factory %r>' % (key,), 'exec'), writer.namespace)
+    return writer.namespace['factory']
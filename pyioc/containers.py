@@ -1,31 +1,74 @@
 # coding=utf-8
 from __future__ import absolute_import
 
-from future.standard_library import install_aliases
-
-install_aliases()
-
 import abc
-import six
+import functools
+import operator
+import types
+import weakref
 
-from future.utils import iteritems
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
+from timeit import default_timer
 from enum import Enum
 
-from pyioc.locators import ObjectLocator, LocatorBase
+from pyioc.locators import ObjectLocator, LocatorBase, UnregisteredKeyError, KeyAlreadyRegisteredError, ChildLocator, \
+    AmbiguousKeyError
 
+import pyioc.codegen as codegen
 import pyioc.providers as providers
+from pyioc._compat import add_metaclass, iteritems
+from pyioc.profiling import ResolutionProfiler, profile_factory
+from pyioc.scopes import Scope, _dispose_instance
 
 InstanceId = namedtuple('InstanceId', ('id', 'namespace'))
 """
 Namedtuple defining ID of instance in namespace container.
 """
 
+DependencyGraphReport = namedtuple('DependencyGraphReport',
+                                   ('dependencies', 'depths', 'missing', 'cycles', 'max_depth', 'max_fan_out'))
+"""
+Namedtuple with results of SimpleContainer.validate(). *dependencies* and *depths* map registered keys to keys of
+their direct dependencies and to the length of their longest chain of dependencies (1 for objects without
+dependencies), *missing* maps keys to their unregistered dependencies and *cycles* lists chains of keys depending
+on each other.
+"""
+
 
 class FormatError(Exception):
     pass
 
 
+class MissingDependencyError(LookupError):
+    pass
+
+
+class DependencyCycleError(Exception):
+    pass
+
+
+class FrozenContainerError(Exception):
+    pass
+
+
+class DisposalTimeoutError(Exception):
+    pass
+
+
+class AsyncResolutionError(Exception):
+    pass
+
+
+_MappingProxyType = getattr(types, 'MappingProxyType', dict)
+
+_CONTEXT_PLAN_CACHE_SIZE = 4096
+
+_PROFILED_METHODS = (('resolve', '_profiled_public_resolve'),
+                     ('_resolve', '_profiled_resolve'),
+                     ('_create_shared', '_profiled_create_shared'),
+                     ('resolve_async', '_profiled_resolve_async'))
+
+
 class InstanceLifetime(Enum):
     """
     Enum representing possible lifetimes of an object in the container.
@@ -39,14 +82,51 @@ class InstanceLifetime(Enum):
     New instance will be created the first time container will be asked for object under given key. Both the callable
     and object will be stored in the container.
     """
+    ThreadSafeSingleton = 2
+    """
+    Same as Singleton, but guarantees that only one instance is created when the container is accessed from many
+    threads at once.
+    """
+    Scoped = 3
+    """
+    New instance will be created once per scope (see SimpleContainer.create_scope()). Objects with this lifetime can
+    be resolved only inside a scope.
+    """
+    WeakSingleton = 4
+    """
+    Same as Singleton, but the container holds only a weak reference to the instance, so a new instance will be
+    created after the previous one was garbage collected.
+    """
+
 
+class TTLSingleton(namedtuple('TTLSingleton', ('seconds', 'refresh_in_background'))):
+    """
+    Lifetime of an object created again after a given number of seconds, usable in place of InstanceLifetime values.
+
+    With refresh_in_background set, the expired instance is still returned while a new one is created in a background
+    thread, so callers don't wait for the rebuild.
+    """
+    __slots__ = ()
 
-@six.add_metaclass(abc.ABCMeta)
+    def __new__(cls, seconds, refresh_in_background=False):
+        return super(TTLSingleton, cls).__new__(cls, seconds, refresh_in_background)
+
+
+@add_metaclass(abc.ABCMeta)
 class IdParserBase(object):
     @abc.abstractmethod
     def parse(self, key):
         pass
 
+    def format(self, instance_id):
+        """
+        Builds the key under which the object is found, used when reporting objects of sub containers.
+
+        :param instance_id: InstanceId instance.
+        :return: Key; InstanceId itself if the parser can't build it.
+        """
+        return instance_id
+
 
 class SimpleIdParser(IdParserBase):
     def parse(self, key):
@@ -72,18 +152,75 @@ class NamespaceIdParser(IdParserBase):
         else:
             raise FormatError('Wrong key format. Expected namespace%sclass' % self._separator)
 
+    def format(self, instance_id):
+        if instance_id.namespace is None or not isinstance(instance_id.id, str):
+            return super(NamespaceIdParser, self).format(instance_id)
+        return instance_id.namespace + self._separator + instance_id.id
+
+
+def _is_lazy_singleton(provider):
+    if not isinstance(provider, (providers.LazySingleInstanceProvider, providers.LazySingleInstanceWithDepsProvider)):
+        return False
+    return not provider.is_async
+
+
+def _is_memoizable_with_deps(provider):
+    if not isinstance(provider, providers.NewInstancesWithDepsProvider):
+        return False
+    if isinstance(provider, providers.ScopedWithDepsProvider) or provider.is_async:
+        return False
+    if getattr(provider, 'is_created', False):
+        return False
+    return isinstance(provider.container, SimpleContainer)
+
+
+def _is_per_call_with_deps(provider):
+    if type(provider) is providers.NewInstancesWithDepsProvider:
+        return True
+    if not isinstance(provider, providers.NewInstancesWithDepsProvider) or provider.is_async:
+        return False
+    return not isinstance(provider, (providers.ScopedWithDepsProvider,) + _SHARED_WITH_DEPS_PROVIDERS)
+
+
+def _get_members(provider):
+    if provider is None:
+        return ()
+    if isinstance(provider, providers.MultiProvider):
+        return provider.providers
+    return (provider,)
+
+
+def _get_dependencies(provider):
+    if isinstance(provider, providers.MultiProvider):
+        return [dependency for member in provider.providers for dependency in _get_dependencies(member)]
+
+    plan = getattr(provider, 'plan', None)
+    if plan is None:
+        return []
+
+    container = provider.container
+    return [(container, key) for key, keyword in plan.select(container)]
+
+
+def _timed_get_instance(provider):
+    start = default_timer()
+    provider.get_instance()
+    return default_timer() - start
+
 
 class SimpleContainer(object):
     """
     a
     """
 
-    def __init__(self, name='', locator=None):
+    def __init__(self, name='', locator=None, codegen=False):
         """
         Raises TypeError when locator object is not derived from LocatorBase class.
 
         :param name: Name for a container.
         :param locator: Locator instance that will be used for storing objects in the container.
+        :param codegen: If True, factories of objects created per call with dependencies are generated as Python
+            functions creating the whole graph of objects created per call at once (see pyioc.codegen).
         """
         if locator is not None:
             if not isinstance(locator, LocatorBase):
@@ -92,18 +229,28 @@ class SimpleContainer(object):
         else:
             self._locator = ObjectLocator()
         self._name = name
+        self._factories = {}
+        self._compiling = set()
+        self._build_plans = weakref.WeakKeyDictionary()
+        self._frozen = False
+        self._children = None
+        self._hooks = None
+        self._context_factories = {}
+        self._selections = {}
+        self._codegen = codegen
 
-    def register_object(self, key, obj):
+    def register_object(self, key, obj, multiple=False):
         """
         Registers object for a given key.
 
         :param key: Key under which the object will be registered
         :param obj: Object
+        :param multiple: If True, the object is added to objects registered under the key - see resolve_all().
         """
         provider = providers.ObjectProvider(obj)
-        self._register_provider_for_key(key, provider)
+        self._register_provider_for_key(key, provider, multiple)
 
-    def register_callable(self, key, callable_object, lifetime=InstanceLifetime.NewInstancePerCall):
+    def register_callable(self, key, callable_object, lifetime=InstanceLifetime.NewInstancePerCall, multiple=False):
         """
         Registers a callable object that will be used to create a new instance of an object that will be returned upon
         calling the get_instance() method.
@@ -111,48 +258,472 @@ class SimpleContainer(object):
         Based on the lifetime parameter, either the callable will be stored, and called whenever object is needed, or
         the callable will be called on registering, and the returned object will be stored.
 
+        Coroutine functions are registered with asynchronous providers - see resolve_async().
+
         :param key:
         :param callable_object: Callable object that will be used to create new object.
         :param lifetime: Specified lifetime of an object that is produced by callable.
+        :param multiple: If True, the callable is added to callables registered under the key - see resolve_all().
         :return:
         """
-        if lifetime == InstanceLifetime.NewInstancePerCall:
+        if providers.is_coroutine_function(callable_object):
+            provider = self._create_async_provider(callable_object, lifetime, with_deps=False)
+        elif lifetime == InstanceLifetime.NewInstancePerCall:
             provider = providers.NewInstancesProvider(callable_object)
         elif lifetime == InstanceLifetime.Singleton:
             provider = providers.LazySingleInstanceProvider(callable_object)
+        elif lifetime == InstanceLifetime.ThreadSafeSingleton:
+            provider = providers.ThreadSafeLazySingleInstanceProvider(callable_object)
+        elif lifetime == InstanceLifetime.Scoped:
+            provider = providers.ScopedProvider(callable_object)
+        elif lifetime == InstanceLifetime.WeakSingleton:
+            provider = providers.WeakSingleInstanceProvider(callable_object, key)
+        elif isinstance(lifetime, TTLSingleton):
+            provider = providers.TTLSingleInstanceProvider(callable_object, *lifetime)
         else:
             raise TypeError('Unsupported instance lifetime.')
 
-        self._register_provider_for_key(key, provider)
+        self._register_provider_for_key(key, provider, multiple)
 
-    def register_callable_with_deps(self, key, callable_object, lifetime=InstanceLifetime.NewInstancePerCall):
-        if lifetime == InstanceLifetime.NewInstancePerCall:
+    def register_callable_with_deps(self, key, callable_object, lifetime=InstanceLifetime.NewInstancePerCall,
+                                    multiple=False):
+        if providers.is_coroutine_function(callable_object):
+            provider = self._create_async_provider(callable_object, lifetime, with_deps=True)
+        elif lifetime == InstanceLifetime.NewInstancePerCall:
             provider = providers.NewInstancesWithDepsProvider(callable_object, self)
         elif lifetime == InstanceLifetime.Singleton:
             provider = providers.LazySingleInstanceWithDepsProvider(callable_object, self)
+        elif lifetime == InstanceLifetime.ThreadSafeSingleton:
+            provider = providers.ThreadSafeLazySingleInstanceWithDepsProvider(callable_object, self)
+        elif lifetime == InstanceLifetime.Scoped:
+            provider = providers.ScopedWithDepsProvider(callable_object, self)
+        elif lifetime == InstanceLifetime.WeakSingleton:
+            provider = providers.WeakSingleInstanceWithDepsProvider(callable_object, self, key)
+        elif isinstance(lifetime, TTLSingleton):
+            provider = providers.TTLSingleInstanceWithDepsProvider(callable_object, self, *lifetime)
         else:
             raise TypeError('Unsupported instance lifetime.')
 
-        self._register_provider_for_key(key, provider)
+        self._register_provider_for_key(key, provider, multiple)
 
     def resolve(self, key, context=None):
         """
         Return instance based on what was registered for a given key.
 
+        Without context the instance is created by the compiled factory for the key (compiled on first use).
+
         :param key: Key under which the object or callable was registered.
         :return: Instance related to that key.
         """
-        return self._resolve(key, context)
+        if context is None:
+            return self.get_factory(key)()
+
+        if not context or isinstance(context, Scope):
+            return self._resolve(key, context)
+
+        try:
+            factory = self._context_factories[(key, frozenset(context))]
+        except KeyError:
+            factory = self._compile_context_factory(key, frozenset(context))
+        return factory(context)
+
+    def resolve_all(self, key, context=None):
+        """
+        Return instances of all objects registered for a given key with *multiple=True*. The same tuple is injected
+        into arguments named after the key.
+
+        :param key: Key under which the objects or callables were registered.
+        :return: Tuple of instances in order of registration (one-element tuple for a single registration).
+        """
+        if isinstance(self._find_provider(key), providers.MultiProvider):
+            return self.resolve(key, context)
+
+        return (self.resolve(key, context),)
+
+    def resolve_many(self, keys, context=None, share_instances=False):
+        """
+        Return instances for many keys in one call.
+
+        :param keys: Iterable of keys under which the objects or callables were registered.
+        :param context: Dictionary of objects overriding registrations.
+        :param share_instances: If True, every registration is resolved at most once in this call, so objects created
+            per call that appear multiple times (as the keys or as dependencies) are shared.
+        :return: Tuple with instances in the order of the keys.
+        """
+        if share_instances:
+            memo = {}
+            return tuple([self._resolve_shared(key, context, memo) for key in keys])
+
+        if context is None:
+            get_factory = self.get_factory
+            return tuple([get_factory(key)() for key in keys])
+
+        resolve = self._resolve
+        return tuple([resolve(key, context) for key in keys])
+
+    def create_scope(self, context=None):
+        """
+        Creates a scope in which objects registered with the Scoped lifetime are created once and shared.
+        Scope can be used as a context manager - scoped objects are disposed on exit.
+
+        :param context: Dictionary of objects overriding registrations in the scope.
+        :return: Scope instance.
+        """
+        return Scope(self, context)
+
+    def resolve_async(self, key, context=None):
+        """
+        Coroutine returning instance registered for a given key. Coroutine factories are awaited, dependencies
+        of objects are resolved concurrently, and concurrent first-time resolves of an asynchronous singleton
+        share a single task. Requires Python 3.5 or newer.
+
+        :param key: Key under which the object or callable was registered.
+        :return: Awaitable resolving to instance related to that key.
+        """
+        from pyioc import aio
+        return aio.resolve(self, key, context)
+
+    def _profiled_resolve_async(self, key, context=None):
+        from pyioc import aio
+        return aio.resolve_profiled(self, key, context)
+
+    def build_async(self, cls, context=None):
+        """
+        Asynchronous version of build(). Requires Python 3.5 or newer.
+
+        :param cls: Class (or coroutine function) of which object to build.
+        :return: Awaitable resolving to the built object.
+        """
+        from pyioc import aio
+        return aio.build(self, cls, context)
+
+    def warm_up(self, keys=None, max_workers=None):
+        """
+        Eagerly creates lazy singletons, so their construction cost is not paid by the first resolve. Singletons are
+        created in dependency order and independent ones are created concurrently on a thread pool. Singletons
+        that the given ones depend on (also through objects created per call) are created as well.
+
+        On Python 2 requires the *futures* package.
+
+        :param keys: Keys of singletons to create. All keys registered in the container by default.
+        :param max_workers: Maximum number of threads creating singletons.
+        :return: Dictionary with time in seconds spent on creating each singleton, by key (summed up for singletons
+            registered under one key with *multiple=True*).
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+        singletons = self._collect_singletons(self.get_keys() if keys is None else keys)
+        pending = OrderedDict((provider, set(deps)) for provider, (key, deps) in iteritems(singletons))
+        times = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers or min(32, max(len(pending), 1))) as executor:
+            running = {}
+            while pending or running:
+                for provider in [provider for provider, deps in iteritems(pending) if not deps]:
+                    del pending[provider]
+                    running[executor.submit(_timed_get_instance, provider)] = provider
+
+                if not running:
+                    raise DependencyCycleError('Cyclic dependency between singletons: %s' %
+                                               ', '.join(str(singletons[provider][0]) for provider in pending))
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    provider = running.pop(future)
+                    key = singletons[provider][0]
+                    times[key] = times.get(key, 0.0) + future.result()
+                    for deps in pending.values():
+                        deps.discard(provider)
+
+        return times
+
+    def close(self, timeout=None, max_workers=None):
+        """
+        Disposes singletons created by objects registered in the container (registered objects are not touched).
+        Each instance is released by its provider first, so a new one is created when the key is resolved again,
+        and then closed with its close() or __exit__(None, None, None) method. Instances are closed in reverse order
+        of construction, so objects are closed before the singletons they depend on, and independent ones are
+        closed concurrently on a thread pool. A NamespacedContainer disposes singletons of its sub containers too.
+
+        On Python 2 requires the *futures* package.
+
+        :param timeout: Seconds to wait for closing of a single instance. After that the singletons it depends on are
+            closed without waiting for it and DisposalTimeoutError is raised at the end (the close() call keeps
+            running on its thread). No limit by default.
+        :param max_workers: Maximum number of threads closing instances.
+        :raises DisposalTimeoutError: When closing of an instance didn't finish in time.
+        :raises Exception: First error raised by closing of an instance, after all other instances were closed.
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+        released = self._release_singletons()
+        if not released:
+            return
+
+        pending = OrderedDict((provider, set(dependents)) for provider, (key, instance, dependents)
+                              in iteritems(released))
+        errors = []
+
+        executor = ThreadPoolExecutor(max_workers=max_workers or min(32, len(pending)))
+        try:
+            running = {}
+            while pending or running:
+                ready = [provider for provider, dependents in iteritems(pending) if not dependents]
+                if not ready and not running:
+                    ready = [next(iter(pending))]
+                for provider in ready:
+                    del pending[provider]
+                    deadline = None if timeout is None else default_timer() + timeout
+                    running[executor.submit(_dispose_instance, released[provider][1])] = (provider, deadline)
+
+                deadlines = [deadline for provider, deadline in running.values() if deadline is not None]
+                wait_time = max(min(deadlines) - default_timer(), 0) if deadlines else None
+                done, _ = wait(running, timeout=wait_time, return_when=FIRST_COMPLETED)
+
+                now = default_timer()
+                for future, (provider, deadline) in list(running.items()):
+                    if future in done:
+                        error = future.exception()
+                        if error is not None:
+                            errors.append(error)
+                    elif deadline is not None and now >= deadline:
+                        errors.append(DisposalTimeoutError('Closing of "%s" did not finish in %s seconds' %
+                                                           (released[provider][0], timeout)))
+                    else:
+                        continue
+
+                    del running[future]
+                    for dependents in pending.values():
+                        dependents.discard(provider)
+        finally:
+            executor.shutdown(wait=False)
+
+        if errors:
+            raise errors[0]
+
+    def aclose(self, timeout=None):
+        """
+        Asynchronous version of close(). Instances are closed with aclose(), __aexit__(None, None, None), close()
+        (awaited when it returns an awaitable) or __exit__(None, None, None), whichever is found first, and
+        independent instances are closed concurrently. Requires Python 3.5 or newer.
+
+        :param timeout: Seconds to wait for closing of a single instance. No limit by default.
+        :return: Awaitable finishing when all instances are closed.
+        """
+        from pyioc import aio
+        return aio.dispose(self._release_singletons(), timeout)
+
+    def create_child(self, name=''):
+        """
+        Creates a child container inheriting all registrations of this container. Registrations are not copied - the
+        child stores only objects registered in it, which override the inherited ones. Objects created per call that
+        were registered in a parent get their dependencies from the child, while singletons are shared with the parent.
+
+        :param name: Name for the child container.
+        :return: ChildContainer instance.
+        """
+        return ChildContainer(self, name=name)
+
+    def validate(self, provided_keys=(), raise_errors=True):
+        """
+        Analyses the dependency graph of all objects registered in the container, so cycles and missing dependencies
+        are found before anything is resolved (e.g. right after the registration at application start).
+
+        :param provided_keys: Keys that are not registered, because they are always passed in the context.
+        :param raise_errors: If False, cycles and missing dependencies are only reported.
+        :raises DependencyCycleError: When objects depend on each other.
+        :raises MissingDependencyError: When a required dependency is not registered.
+        :raises AmbiguousKeyError: When a required dependency is a base class of many registered classes (it is
+            reported as missing too).
+        :return: DependencyGraphReport instance.
+        """
+        provided_keys = frozenset(provided_keys)
+        depths = {}
+        fan_outs = {}
+        visiting = OrderedDict()
+        missing = OrderedDict()
+        ambiguous = []
+        cycles = []
+
+        def visit(key, provider):
+            if provider in depths:
+                return depths[provider]
+            if provider in visiting:
+                chain = list(visiting.values())
+                cycles.append(tuple(chain[list(visiting).index(provider):]) + (key,))
+                return 0
+
+            visiting[provider] = key
+            depth = 0
+            dependencies = _get_dependencies(provider)
+            for container, dependency_key in dependencies:
+                dependency = container._find_provider(dependency_key)
+                if dependency is not None:
+                    depth = max(depth, visit(dependency_key, dependency))
+                elif dependency_key not in provided_keys:
+                    missing.setdefault(key, []).append(dependency_key)
+                    if providers._is_ambiguous(container, dependency_key):
+                        ambiguous.append(dependency_key)
+            del visiting[provider]
+
+            fan_outs[provider] = len(dependencies)
+            depths[provider] = depth + 1
+            return depth + 1
+
+        graph = OrderedDict()
+        key_depths = OrderedDict()
+        for key, container, container_key in self._get_validated_keys():
+            provider = container._find_provider(container_key)
+            key_depths[key] = visit(key, provider)
+            graph[key] = tuple(dependency_key for container, dependency_key in _get_dependencies(provider))
+
+        if raise_errors and cycles:
+            raise DependencyCycleError('Cyclic dependencies: %s' %
+                                       '; '.join(' -> '.join(str(key) for key in cycle) for cycle in cycles))
+        if raise_errors and ambiguous:
+            raise AmbiguousKeyError(ambiguous[0])
+        if raise_errors and missing:
+            raise MissingDependencyError('Missing dependencies: %s' %
+                                         '; '.join('%s -> %s' % (key, ', '.join(str(dependency) for dependency in keys))
+                                                   for key, keys in iteritems(missing)))
+
+        return DependencyGraphReport(dependencies=graph, depths=key_depths,
+                                     missing=OrderedDict((key, tuple(keys)) for key, keys in iteritems(missing)),
+                                     cycles=cycles, max_depth=max([0] + list(depths.values())),
+                                     max_fan_out=max([0] + list(fan_outs.values())))
+
+    def enable_profiling(self, hooks=None):
+        """
+        Enables calling of profiling hooks around every provider call made while resolving objects from
+        the container. Compiled factories are dropped, so they are compiled again with the hooks; resolution is not
+        slowed down at all while profiling is disabled. Child containers created with create_child() afterwards use
+        the same hooks.
+
+        :param hooks: ResolutionHooks instance. A new ResolutionProfiler by default.
+        :return: Enabled hooks.
+        """
+        self._hooks = hooks if hooks is not None else ResolutionProfiler()
+        for name, profiled_name in _PROFILED_METHODS:
+            setattr(self, name, getattr(self, profiled_name))
+        self._invalidate()
+        return self._hooks
+
+    def disable_profiling(self):
+        """
+        Disables profiling hooks enabled with enable_profiling().
+        """
+        self._hooks = None
+        for name, profiled_name in _PROFILED_METHODS:
+            self.__dict__.pop(name, None)
+        self._invalidate()
+
+    @property
+    def profiling_hooks(self):
+        """
+        Hooks enabled with enable_profiling(), None when profiling is disabled.
+        """
+        return self._hooks
+
+    def freeze(self):
+        """
+        Freezes the container and returns its read-only snapshot. Factories of all keys registered in the container
+        itself are compiled up front, so resolving them without context from the snapshot is a lookup in a read-only
+        mapping. Registering objects in a frozen container (or its snapshot) raises FrozenContainerError.
+
+        Containers from which the container gets objects are frozen as well (parents of a child container and sub
+        containers of a NamespacedContainer), so the precompiled factories can't go stale.
+
+        Other resolves are delegated to the frozen container, which still fills its caches on the way: namespaced keys
+        (compiled factories, routes and parsed keys) and resolves with context (context plans). Lazy singletons are
+        still created on first use - use the ThreadSafeSingleton lifetime or warm_up() when the snapshot is shared
+        between threads.
+
+        :return: FrozenContainer instance.
+        """
+        self._freeze()
+        return FrozenContainer(self)
+
+    @property
+    def frozen(self):
+        """
+        True when the container was frozen.
+        """
+        return self._frozen
+
+    def compile(self):
+        """
+        Compiles factories for all keys registered in the container. Every factory is a flattened resolution plan
+        of the key's whole dependency graph calling constructors directly, so resolving the key costs a single
+        function call. Compiled factories are dropped whenever a new object is registered and by invalidate().
+        """
+        for key in self.get_keys():
+            self.get_factory(key)
+
+    def get_factory(self, key):
+        """
+        Returns compiled factory for a given key. Keys not registered in the container (and keys on a dependency
+        cycle) get a factory falling back to the regular resolution, which is not cached.
+
+        :param key: Key under which the object or callable was registered.
+        :return: Callable without arguments returning instance related to that key.
+        """
+        try:
+            return self._factories[key]
+        except KeyError:
+            return self._compile_factory(key)
 
     def build(self, cls, context=None):
         """
         Build a new instance of class cls injecting dependencies of an object from objects registered in the container.
 
+        The dependency plan of the class is computed on the first build and cached (without keeping the class
+        alive), so repeated builds cost only the dependency resolution and the constructor call.
+
         :param cls: Class of which object to build.
         :return:
         """
-        provider = providers.NewInstancesWithDepsProvider(cls, self)
-        return provider.get_instance(context)
+        try:
+            plan = self._build_plans[cls]
+        except (KeyError, TypeError):
+            plan = self._prepare_build(cls)
+
+        keys = plan.keys
+        resolve = self.resolve
+
+        if keys is None:
+            selected = plan.select(self, context)
+            keys = selected.keys
+            if keys is None:
+                args, kwargs = plan.split(selected, [resolve(key, context) for key, keyword in selected])
+                return cls(*args, **kwargs)
+
+        if keys:
+            return cls(*[resolve(key, context) for key in keys])
+
+        return cls()
+
+    def invalidate_build_plans(self):
+        """
+        Drops dependency plans cached by build(). Needed only when signatures of built classes were changed.
+        """
+        self._build_plans.clear()
+
+    def invalidate(self, key=None):
+        """
+        Recomputes dependency plans of callables registered with dependencies and drops all compiled factories and
+        plans cached by build(). Needed only when signatures of registered callables were changed after registration
+        (e.g. a class was monkeypatched).
+
+        :param key: Key of which the dependency plan is recomputed. All keys registered in the container by default.
+        """
+        for key in (self.get_keys() if key is None else (key,)):
+            for provider in _get_members(self._find_provider(key)):
+                invalidate = getattr(provider, 'invalidate', None)
+                if invalidate is not None:
+                    invalidate()
+
+        self._build_plans.clear()
+        self._invalidate()
 
     @property
     def name(self):
@@ -163,6 +734,24 @@ class SimpleContainer(object):
         """
         return self._name
 
+    def is_resolvable(self, key, context=None):
+        """
+        Checks if an object can be resolved for a given key - it is in the context or registered in the container.
+
+        :param key: Key to look for.
+        :param context: Dictionary of objects overriding registrations.
+        :return: True if the key can be resolved, otherwise False.
+        """
+        if context:
+            try:
+                context[self._context_key(key)]
+            except KeyError:
+                pass
+            else:
+                return True
+
+        return self._find_provider(key) is not None
+
     def get_keys(self):
         """
         Get all keys registered in that container.
@@ -183,15 +772,356 @@ class SimpleContainer(object):
         instance_provider = self._locator.locate(key)
         return instance_provider.get_instance(context)
 
-    def _register_provider_for_key(self, id, provider):
-        self._locator.register(id, provider)
+    def _profiled_public_resolve(self, key, context=None):
+        # context plans call providers directly, so resolves with context go through the hooked _resolve()
+        if context is None:
+            return self.get_factory(key)()
+        return self._resolve(key, context)
+
+    def _profiled_resolve(self, key, context=None):
+        if context:
+            try:
+                return context[self._context_key(key)]
+            except KeyError:
+                pass
+
+        provider = self._find_provider(key)
+        if provider is None:
+            return type(self)._resolve(self, key, context)
+
+        return profile_factory(key, provider, functools.partial(provider.get_instance, context), self._hooks)()
+
+    def _register_provider_for_key(self, id, provider, multiple=False):
+        if self._frozen:
+            raise FrozenContainerError('Container "%s" is frozen' % self.name)
+
+        if multiple:
+            registered = self._locator.get_or_default(id, None)
+            if registered is None:
+                self._locator.register(id, providers.MultiProvider((provider,)))
+            elif isinstance(registered, providers.MultiProvider):
+                registered.add(provider)
+            else:
+                raise KeyAlreadyRegisteredError(id)
+        else:
+            self._locator.register(id, provider)
+
+        self._invalidate()
+
+    def _invalidate(self):
+        self._factories.clear()
+        self._context_factories.clear()
+        self._selections.clear()
+        if self._children:
+            for child in list(self._children):
+                child._invalidate()
+
+    def _get_own_keys(self):
+        return self.get_keys()
+
+    def _freeze(self):
+        self._frozen = True
+
+    def _release_singletons(self):
+        # releases instances of singletons registered in this container, newest first; returns dictionary of
+        # (key, instance, providers of released instances depending on it) by provider
+        containers = self._get_disposed_containers()
+        owned = {}
+        multi_providers = []
+        for container in containers:
+            for key in container._get_own_keys():
+                provider = container._locator.get_or_default(key, None)
+                if isinstance(provider, providers.MultiProvider):
+                    multi_providers.append(provider)
+
+                for member in _get_members(provider):
+                    if getattr(member, 'construction_order', None) is not None:
+                        owned[member] = key
+
+        boundaries = {}
+        visiting = set()
+
+        def owned_dependencies(provider):
+            # owned singletons that the provider depends on directly or through objects which are not owned
+            if provider in boundaries:
+                return boundaries[provider]
+            if provider in visiting:
+                return set()
+
+            visiting.add(provider)
+            result = set()
+            for container, key in _get_dependencies(provider):
+                dependency = container._find_provider(key)
+                if dependency is None:
+                    continue
+                members = dependency.providers if isinstance(dependency, providers.MultiProvider) else (dependency,)
+                for member in members:
+                    if member in owned:
+                        result.add(member)
+                    else:
+                        result.update(owned_dependencies(member))
+            visiting.discard(provider)
+
+            boundaries[provider] = result
+            return result
+
+        dependents = dict((provider, set()) for provider in owned)
+        for provider in owned:
+            for dependency in owned_dependencies(provider):
+                if dependency is not provider:
+                    dependents[dependency].add(provider)
+
+        released = OrderedDict()
+        for provider in sorted(owned, key=lambda provider: provider.construction_order, reverse=True):
+            instance = provider.release()
+            if instance is not None:
+                released[provider] = (owned[provider], instance, dependents[provider])
+
+        for provider in released:
+            released[provider] = released[provider][:2] + (released[provider][2].intersection(released),)
+
+        for provider in multi_providers:
+            provider.clear_cache()
+        for container in containers:
+            container._invalidate()
+
+        return released
+
+    def _get_disposed_containers(self):
+        # containers of which singletons are disposed by close()
+        return [self]
+
+    def _get_validated_keys(self):
+        # (reported key, container, key in the container) of objects checked by validate()
+        return [(key, self, key) for key in self.get_keys()]
+
+    def _add_child(self, child):
+        if self._children is None:
+            self._children = weakref.WeakSet()
+        self._children.add(child)
+
+    def _create_async_provider(self, callable_object, lifetime, with_deps):
+        from pyioc import aio
+
+        if lifetime == InstanceLifetime.NewInstancePerCall:
+            if with_deps:
+                return aio.AsyncNewInstancesWithDepsProvider(callable_object, self)
+            return aio.AsyncNewInstancesProvider(callable_object)
+        elif lifetime in (InstanceLifetime.Singleton, InstanceLifetime.ThreadSafeSingleton):
+            if with_deps:
+                return aio.AsyncLazySingleInstanceWithDepsProvider(callable_object, self)
+            return aio.AsyncLazySingleInstanceProvider(callable_object)
+        else:
+            raise TypeError('Unsupported instance lifetime.')
+
+    def _resolve_shared(self, key, context, memo):
+        if context:
+            try:
+                return context[self._context_key(key)]
+            except KeyError:
+                pass
+
+        provider = self._find_provider(key)
+        if provider is None:
+            return self._resolve(key, context)
+
+        try:
+            return memo[provider]
+        except KeyError:
+            pass
+
+        instance = memo[provider] = self._create_shared(key, provider, context, memo)
+        return instance
+
+    def _create_shared(self, key, provider, context, memo):
+        if _is_memoizable_with_deps(provider):
+            container = provider.container
+            selected = provider.plan.select(container, context)
+            args, kwargs = provider.plan.split(
+                selected, [container._resolve_shared(arg, context, memo) for arg, keyword in selected])
+            return provider.create_instance(args, kwargs)
+
+        return provider.get_instance(context)
+
+    def _profiled_create_shared(self, key, provider, context, memo):
+        create = functools.partial(type(self)._create_shared, self, key, provider, context, memo)
+        return profile_factory(key, provider, create, self._hooks)()
+
+    def _prepare_build(self, cls):
+        if not callable(cls):
+            raise TypeError('Argument "cls" must be a callable')
+
+        plan = providers.get_dependency_plan(cls)
+        try:
+            self._build_plans[cls] = plan
+        except TypeError:
+            pass
+
+        return plan
+
+    def _context_key(self, key):
+        return key
+
+    def _collect_singletons(self, keys):
+        singletons = OrderedDict()
+        boundaries = {}
+        visiting = set()
+
+        def add_singleton(key, provider):
+            if provider not in singletons:
+                singletons[provider] = (key, ())
+                singletons[provider] = (key, singletons_boundary(provider))
+
+        def singletons_boundary(provider):
+            # singletons that the provider depends on directly or through objects created per call
+            if provider in boundaries:
+                return boundaries[provider]
+            if provider in visiting:
+                return set()
+
+            visiting.add(provider)
+            result = set()
+            plan = getattr(provider, 'plan', None)
+            for arg, keyword in (plan.select(provider.container) if plan is not None else ()):
+                for dependency in _get_members(provider.container._find_provider(arg)):
+                    if _is_lazy_singleton(dependency):
+                        add_singleton(arg, dependency)
+                        result.add(dependency)
+                    else:
+                        result.update(singletons_boundary(dependency))
+            visiting.discard(provider)
+
+            boundaries[provider] = result
+            return result
+
+        for key in keys:
+            provider = self._find_provider(key)
+            if provider is None:
+                raise UnregisteredKeyError(key)
+            for member in _get_members(provider):
+                if _is_lazy_singleton(member):
+                    add_singleton(key, member)
+
+        return singletons
+
+    def _find_provider(self, key):
+        return self._locator.get_or_default(key, None)
+
+    def _compile_context_factory(self, key, overrides):
+        # Factories taking the context, which read overridden keys from the context, rebuild objects created per call
+        # that depend on them and use compiled factories for everything else.
+        if len(self._context_factories) >= _CONTEXT_PLAN_CACHE_SIZE:
+            self._context_factories.clear()
+
+        nodes = {}
+        self._compile_context_node(key, overrides, dict.fromkeys(overrides), nodes)
+        for node_key, (factory, affected) in iteritems(nodes):
+            self._context_factories[(node_key, overrides)] = factory
+        return nodes[key][0]
+
+    def _compile_context_node(self, key, overrides, probe, nodes):
+        try:
+            return nodes[key]
+        except KeyError:
+            pass
+
+        context_key = self._context_key(key)
+        if context_key in overrides:
+            node = nodes[key] = (operator.itemgetter(context_key), True)
+            return node
+
+        resolve = self._resolve
+        nodes[key] = (lambda context: resolve(key, context), True)
+
+        provider = self._find_provider(key)
+        if provider is None:
+            return nodes[key]
+
+        members = provider.providers if isinstance(provider, providers.MultiProvider) else (provider,)
+        affected = False
+        for member in members:
+            plan = getattr(member, 'plan', None)
+            if plan is None or providers._returns_same_instance(member):
+                continue
+            if member.container is not self:
+                affected = True
+                continue
+            for dependency_key, keyword in plan.select(self, probe):
+                affected = self._compile_context_node(dependency_key, overrides, probe, nodes)[1] or affected
+
+        if not affected:
+            factory = self.get_factory(key)
+            node = nodes[key] = (lambda context: factory(), False)
+            return node
+
+        if _is_per_call_with_deps(provider) and provider.container is self:
+            node = nodes[key] = (self._compile_rebuild(provider, probe, nodes), True)
+            return node
+
+        node = nodes[key] = (provider.get_instance, True)
+        return node
+
+    @staticmethod
+    def _compile_rebuild(provider, probe, nodes):
+        selected = provider.plan.select(provider.container, probe)
+        factories = tuple(nodes[dependency_key][0] for dependency_key, keyword in selected)
+        callable_object = provider.callable_object
+
+        if providers.needs_split(selected):
+            split = provider.plan.split
+
+            def rebuild_with_keywords(context):
+                args, kwargs = split(selected, [factory(context) for factory in factories])
+                return callable_object(*args, **kwargs)
+
+            return rebuild_with_keywords
+
+        if not factories:
+            return lambda context: callable_object()
+
+        if len(factories) == 1:
+            factory = factories[0]
+            return lambda context: callable_object(factory(context))
+
+        return lambda context: callable_object(*[factory(context) for factory in factories])
+
+    def _compile_factory(self, key):
+        provider = self._find_provider(key)
+        if provider is None or key in self._compiling:
+            return functools.partial(self._resolve, key)
+
+        self._compiling.add(key)
+        try:
+            factory = None
+            if self._codegen and self._hooks is None:
+                factory = codegen.generate_factory(self, key, provider)
+            if factory is None:
+                factory = provider.get_factory()
+        finally:
+            self._compiling.discard(key)
+
+        if self._hooks is not None:
+            factory = profile_factory(key, provider, factory, self._hooks)
+
+        self._factories[key] = factory
+        return factory
 
 
 class NamespacedContainer(SimpleContainer):
-    def __init__(self, name='', locator=None, name_resolver=None):
-        super(NamespacedContainer, self).__init__(name=name, locator=locator)
+    def __init__(self, name='', locator=None, name_resolver=None, parse_cache_size=1024, codegen=False):
+        """
+        :param name: Name for a container.
+        :param locator: Locator instance that will be used for storing objects in the container.
+        :param name_resolver: Parser splitting keys into namespace and id. NamespaceIdParser is used by default.
+        :param parse_cache_size: Maximum number of parsed keys remembered by the container.
+        :param codegen: If True, factories are generated as Python functions (see SimpleContainer).
+        """
+        super(NamespacedContainer, self).__init__(name=name, locator=locator, codegen=codegen)
         self._sub_containers = {}
         self._name_resolver = name_resolver or NamespaceIdParser()
+        self._parsed_ids = {}
+        self._parse_cache_size = parse_cache_size
+        self._routes = {}
 
         self._sub_containers[self.name] = self
 
@@ -201,10 +1131,20 @@ class NamespacedContainer(SimpleContainer):
         except:
             raise TypeError('Locator must be of type: "%s"  or its subclass' % SimpleContainer.__class__.__name__)
 
+        if self._frozen:
+            raise FrozenContainerError('Container "%s" is frozen' % self.name)
+
         if name in self._sub_containers.keys():
             raise KeyError('Container with name: "%s" is already registered' % name)
 
         self._sub_containers[container.name] = container
+        self._parsed_ids.clear()
+        self._invalidate()
+
+        # registrations in the sub container drop the routes and factories of this container
+        add_child = getattr(container, '_add_child', None)
+        if add_child is not None:
+            add_child(self)
 
     def get_sub_container(self, name):
         return self._sub_containers[name]
@@ -225,25 +1165,287 @@ class NamespacedContainer(SimpleContainer):
 
         return result
 
+    def _find_provider(self, key):
+        try:
+            return self._routes[key]
+        except KeyError:
+            pass
+
+        provider = self._route(key)
+        if provider is not None:
+            self._routes[key] = provider
+
+        return provider
+
+    def _invalidate(self):
+        self._routes.clear()
+        super(NamespacedContainer, self)._invalidate()
+
+    def _freeze(self):
+        if self._frozen:
+            return
+        super(NamespacedContainer, self)._freeze()
+        for container in self._sub_containers.values():
+            if isinstance(container, SimpleContainer):
+                container._freeze()
+
+    def _get_disposed_containers(self):
+        containers = [self]
+        for container in self._sub_containers.values():
+            if container is not self and isinstance(container, SimpleContainer):
+                containers.extend(sub for sub in container._get_disposed_containers() if sub not in containers)
+        return containers
+
+    def _get_validated_keys(self):
+        keys = super(NamespacedContainer, self)._get_validated_keys()
+        for name, container in iteritems(self._sub_containers):
+            if container is self or not isinstance(container, SimpleContainer):
+                continue
+            keys.extend((self._name_resolver.format(InstanceId(key, name)), sub, sub_key)
+                        for key, sub, sub_key in container._get_validated_keys())
+        return keys
+
+    def _context_key(self, key):
+        if isinstance(key, str):
+            return self._parse_id(key).id
+        return key
+
+    def _route(self, key):
+        if isinstance(key, str):
+            instance_id = self._parse_id(key)
+            key = instance_id.id
+
+            if instance_id.namespace and instance_id.namespace != self.name:
+                container = self._sub_containers.get(instance_id.namespace)
+                if not isinstance(container, SimpleContainer):
+                    return None
+                return container._find_provider(key)
+
+        return self._locator.get_or_default(key, None)
+
     def _resolve(self, id, context=None):
+        if context and isinstance(id, str):
+            try:
+                return context[self._parse_id(id).id]
+            except KeyError:
+                pass
+
+        provider = self._find_provider(id)
+        if provider is None:
+            return self._resolve_unrouted(id, context)
+
+        return provider.get_instance(context)
+
+    def _resolve_unrouted(self, id, context=None):
         if isinstance(id, str):
-            instance_id = self._name_resolver.parse(id)
+            instance_id = self._parse_id(id)
 
             if instance_id.namespace:
                 container = self._sub_containers[instance_id.namespace]
                 return container.resolve(instance_id.id, context)
-            else:
-                if context:
-                    try:
-                        item = context[instance_id.id]
-                    except KeyError:
-                        pass
-                    else:
-                        return item
 
-                provider = self._locator.locate(instance_id.id)
-                return provider.get_instance(context)
+            id = instance_id.id
 
-        else:
-            provider = self._locator.locate(id)
-            return provider.get_instance(context)
+        provider = self._locator.locate(id)
+        return provider.get_instance(context)
+
+    def _parse_id(self, key):
+        try:
+            return self._parsed_ids[key]
+        except KeyError:
+            pass
+
+        instance_id = self._name_resolver.parse(key)
+
+        if len(self._parsed_ids) >= self._parse_cache_size:
+            self._parsed_ids.clear()
+        self._parsed_ids[key] = instance_id
+
+        return instance_id
+
+
+_SHARED_WITH_DEPS_PROVIDERS = (providers.LazySingleInstanceWithDepsProvider,
+                               providers.WeakSingleInstanceWithDepsProvider,
+                               providers.TTLSingleInstanceWithDepsProvider)
+
+
+def _is_rebindable(provider):
+    if not isinstance(provider, providers.NewInstancesWithDepsProvider):
+        return False
+    return not isinstance(provider, _SHARED_WITH_DEPS_PROVIDERS)
+
+
+class ChildContainer(SimpleContainer):
+    """
+    Container inheriting registrations of its parent container, created with SimpleContainer.create_child().
+    Keys which are not registered in the child or its parents' locators (e.g. namespaced keys of a NamespacedContainer)
+    are found by the parent.
+    """
+
+    def __init__(self, parent, name=''):
+        """
+        :param parent: Container from which the registrations are inherited.
+        :param name: Name for a container.
+        """
+        super(ChildContainer, self).__init__(name=name, locator=ChildLocator(parent._locator), codegen=parent._codegen)
+        self._parent = parent
+        self._rebound = {}
+        parent._add_child(self)
+        if parent._hooks is not None:
+            self.enable_profiling(parent._hooks)
+
+    @property
+    def parent(self):
+        """
+        Container from which the registrations are inherited.
+        """
+        return self._parent
+
+    def _find_provider(self, key):
+        provider = self._locator.get_or_default(key, None)
+        if provider is None:
+            # keys routed by the parent (e.g. namespaced keys of its sub containers) are not rebound
+            return self._parent._find_provider(key)
+        if not _is_rebindable(provider) or provider.container is self:
+            return provider
+
+        try:
+            return self._rebound[provider]
+        except KeyError:
+            rebound = self._rebound[provider] = provider.bind(self)
+            return rebound
+
+    def _resolve(self, key, context=None):
+        if context:
+            try:
+                return context[self._context_key(key)]
+            except KeyError:
+                pass
+
+        provider = self._find_provider(key)
+        if provider is None:
+            return self._parent._resolve(key, context)
+
+        return provider.get_instance(context)
+
+    def _context_key(self, key):
+        return self._parent._context_key(key)
+
+    def _invalidate(self):
+        self._locator.clear_cache()
+        self._rebound.clear()
+        super(ChildContainer, self)._invalidate()
+
+    def _get_own_keys(self):
+        return self._locator.get_own_keys()
+
+    def _freeze(self):
+        super(ChildContainer, self)._freeze()
+        self._parent._freeze()
+
+
+class FrozenContainer(object):
+    """
+    Read-only snapshot of a frozen container, created with SimpleContainer.freeze().
+
+    Registered keys are resolved from a read-only mapping of precompiled factories. Keys that are not registered
+    in the container itself (e.g. namespaced keys of sub containers) and resolves with context are delegated to the
+    frozen container, which caches compiled factories, routes and context plans for them on first use.
+    """
+
+    def __init__(self, container):
+        """
+        :param container: Frozen container.
+        """
+        self._container = container
+        self._compile()
+
+    @property
+    def name(self):
+        """
+        The name of the container.
+
+        :return: str with the name of the container.
+        """
+        return self._container.name
+
+    @property
+    def frozen(self):
+        return True
+
+    @property
+    def factories(self):
+        """
+        Read-only mapping of registered keys to compiled factories.
+        """
+        return self._factories
+
+    def resolve(self, key, context=None):
+        """
+        Return instance based on what was registered for a given key.
+
+        :param key: Key under which the object or callable was registered.
+        :return: Instance related to that key.
+        """
+        if context is None:
+            try:
+                factory = self._factories[key]
+            except KeyError:
+                return self._container.resolve(key)
+            return factory()
+
+        return self._container.resolve(key, context)
+
+    def resolve_all(self, key, context=None):
+        return self._container.resolve_all(key, context)
+
+    def resolve_many(self, keys, context=None, share_instances=False):
+        if context is None and not share_instances:
+            resolve = self.resolve
+            return tuple([resolve(key) for key in keys])
+
+        return self._container.resolve_many(keys, context, share_instances)
+
+    def resolve_async(self, key, context=None):
+        return self._container.resolve_async(key, context)
+
+    def build(self, cls, context=None):
+        return self._container.build(cls, context)
+
+    def build_async(self, cls, context=None):
+        return self._container.build_async(cls, context)
+
+    def create_scope(self, context=None):
+        return self._container.create_scope(context)
+
+    def close(self, timeout=None, max_workers=None):
+        try:
+            self._container.close(timeout, max_workers)
+        finally:
+            self._compile()
+
+    def aclose(self, timeout=None):
+        # singletons are released right away, so the factories are recompiled before the instances are closed
+        awaitable = self._container.aclose(timeout)
+        self._compile()
+        return awaitable
+
+    def is_resolvable(self, key, context=None):
+        return self._container.is_resolvable(key, context)
+
+    def get_keys(self):
+        return list(self._factories.keys())
+
+    def register_object(self, key, obj, multiple=False):
+        raise FrozenContainerError('Container "%s" is frozen' % self.name)
+
+    def register_callable(self, key, callable_object, lifetime=InstanceLifetime.NewInstancePerCall, multiple=False):
+        raise FrozenContainerError('Container "%s" is frozen' % self.name)
+
+    def register_callable_with_deps(self, key, callable_object, lifetime=InstanceLifetime.NewInstancePerCall,
+                                    multiple=False):
+        raise FrozenContainerError('Container "%s" is frozen' % self.name)
+
+    def _compile(self):
+        container = self._container
+        self._factories = _MappingProxyType(dict((key, container.get_factory(key)) for key in container.get_keys()))
@@ -4,14 +4,11 @@ Module containing implementation of the service locator.
 """
 from __future__ import absolute_import
 
-from future.standard_library import install_aliases
-
-install_aliases()
-
 import inspect
-import six
 import abc
 
+from pyioc._compat import add_metaclass
+
 
 class KeyToStringConverter(object):
     def generate_key(self, obj):
@@ -45,11 +42,23 @@ class KeyAlreadyRegisteredError(KeyError):
         return self.__str__()
 
 
-@six.add_metaclass(abc.ABCMeta)
+class AmbiguousKeyError(LookupError):
+    def __init__(self, key):
+        self._key = key
+
+    def __str__(self):
+        return 'There is more than one object registered for subclasses of the "%s" key' % self._key
+
+    def __unicode__(self):
+        return self.__str__()
+
+
+@add_metaclass(abc.ABCMeta)
 class LocatorBase(object):
     """
     Abstract Class Base declaring locator interface.
     """
+    __slots__ = ()
 
     @abc.abstractmethod
     def register(self, key, obj):
@@ -71,6 +80,7 @@ class ObjectLocator(LocatorBase):
     """
     Simple object locator implementation.
     """
+    __slots__ = ('_objects',)
 
     def __init__(self):
         self._objects = {}
@@ -124,7 +134,7 @@ class ObjectLocator(LocatorBase):
         :return: True if there is a key in the locator, otherwise False.
         """
         try:
-            self._objects[key]
+            self._get_instance(key)
         except KeyError:
             return False
         return True
@@ -137,3 +147,129 @@ class ObjectLocator(LocatorBase):
 
     def _set_instance(self, key, value):
         self._objects[key] = value
+
+
+_AMBIGUOUS = object()
+
+
+class TypeLocator(ObjectLocator):
+    """
+    Object locator resolving classes to objects registered for their subclasses.
+
+    Every class registered as a key is added to an index of its base classes (from its MRO), so locating a base class
+    is a dictionary lookup. Objects registered directly for a key always take precedence. Locating a base class
+    with more than one registered subclass raises AmbiguousKeyError, while get_or_default() returns the default for it.
+    Virtual subclasses of ABCs are not indexed.
+    """
+    __slots__ = ('_bases',)
+
+    def __init__(self):
+        super(TypeLocator, self).__init__()
+        self._bases = {}
+
+    def get_or_default(self, key, default):
+        """
+        Gets the object for a given key, returning *default* also for base classes with many registered subclasses
+        (only locate() raises AmbiguousKeyError).
+        """
+        try:
+            return super(TypeLocator, self).get_or_default(key, default)
+        except AmbiguousKeyError:
+            return default
+
+    def is_key_registered(self, key):
+        try:
+            return super(TypeLocator, self).is_key_registered(key)
+        except AmbiguousKeyError:
+            return True
+
+    def _get_instance(self, key):
+        try:
+            return self._objects[key]
+        except KeyError:
+            subclass = self._bases.get(key) if inspect.isclass(key) else None
+            if subclass is None:
+                raise
+            if subclass is _AMBIGUOUS:
+                raise AmbiguousKeyError(key)
+            return self._objects[subclass]
+
+    def _set_instance(self, key, value):
+        super(TypeLocator, self)._set_instance(key, value)
+
+        if not inspect.isclass(key):
+            return
+
+        for base in inspect.getmro(key)[1:]:
+            if base is object:
+                continue
+            registered = self._bases.get(base)
+            if registered is None:
+                self._bases[base] = key
+            elif registered is not key:
+                self._bases[base] = _AMBIGUOUS
+
+
+_MISSING = object()
+
+
+class ChildLocator(ObjectLocator):
+    """
+    Locator storing only objects registered in it, falling back to the parent locator for all other keys.
+
+    Objects found in the parent are cached in a flattened view, so lookups don't walk the whole chain of parents.
+    The view has to be cleared with clear_cache() when objects are registered in any of the parents (containers
+    do it automatically).
+    """
+    __slots__ = ('_parent', '_view')
+
+    def __init__(self, parent):
+        """
+        :param parent: Locator to fall back to.
+        """
+        super(ChildLocator, self).__init__()
+        self._parent = parent
+        self._view = {}
+
+    @property
+    def parent(self):
+        return self._parent
+
+    def clear_cache(self):
+        """
+        Clears the flattened view of objects found in the parent.
+        """
+        self._view.clear()
+
+    def get_keys(self):
+        keys = self._parent.get_keys()
+        keys.extend(key for key in self._objects if key not in keys)
+        return keys
+
+    def get_own_keys(self):
+        """
+        Keys of objects registered in this locator, without keys of the parent.
+        """
+        return list(self._objects.keys())
+
+    def _get_instance(self, key):
+        try:
+            return self._objects[key]
+        except KeyError:
+            pass
+
+        try:
+            return self._view[key]
+        except KeyError:
+            pass
+
+        instance = self._parent.get_or_default(key, _MISSING)
+        if instance is _MISSING:
+            raise KeyError(key)
+
+        self._view[key] = instance
+        return instance
+
+    def _set_instance(self, key, value):
+        super(ChildLocator, self)._set_instance(key, value)
+        self._view.pop(key, None)
@@ -0,0 +1,171 @@
+# coding=utf-8
+"""
+Module containing instrumentation of object resolution - hooks called around creating instances by providers
+and a profiler collecting timing statistics per key. See SimpleContainer.enable_profiling().
+"""
+from __future__ import absolute_import
+
+import threading
+
+from timeit import default_timer
+
+try:
+    from contextvars import ContextVar
+except ImportError:
+    ContextVar = None
+
+
+class ResolutionHooks(object):
+    """
+    Base class of hooks called by a container with enabled profiling around every call of a provider.
+    Both methods do nothing, subclasses override the ones they need.
+    """
+
+    def before_get_instance(self, key, provider):
+        """
+        Called before the provider registered under the key creates (or returns) the instance.
+
+        :param key: Key that is being resolved.
+        :param provider: Provider registered under the key.
+        """
+
+    def after_get_instance(self, key, provider, elapsed):
+        """
+        Called after the provider returned the instance or raised an error.
+
+        :param key: Key that is being resolved.
+        :param provider: Provider registered under the key.
+        :param elapsed: Time in seconds spent in the provider, including resolution of dependencies.
+        """
+
+
+class KeyStats(object):
+    """
+    Timing statistics of a single key. Times are in seconds.
+    """
+    __slots__ = ('count', 'total_time', 'self_time', 'max_time', 'dependencies')
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.self_time = 0.0
+        self.max_time = 0.0
+        self.dependencies = {}
+        """
+        Cumulative time spent on resolving each dependency of the key, by dependency key.
+        """
+
+
+class ResolutionProfiler(ResolutionHooks):
+    """
+    Hooks collecting per key call counts, cumulative, exclusive (without dependencies) and maximal time of
+    resolution, and the time spent on each dependency of the key. Safe to use from many threads.
+
+    resolve_async() times include awaiting the instances, and concurrently resolved dependencies are tracked per task
+    (on Python 3.7 or newer), so the self time of an object with concurrent dependencies may be underestimated.
+    Instances returned by asynchronous providers from resolve() are coroutines, so their timings don't include
+    awaiting them.
+    """
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+        # stack of [key, time spent on dependencies] frames being resolved, as a (frame, parent stack) chain
+        if ContextVar is not None:
+            self._stack = ContextVar('pyioc_profiler_stack_%d' % id(self), default=None)
+        else:
+            self._stack = _ThreadLocalVar()
+
+    @property
+    def stats(self):
+        """
+        Dictionary of KeyStats by resolved key.
+        """
+        return self._stats
+
+    def reset(self):
+        """
+        Drops all collected statistics.
+        """
+        with self._lock:
+            self._stats = {}
+
+    def before_get_instance(self, key, provider):
+        self._stack.set(([key, 0.0], self._stack.get()))
+
+    def after_get_instance(self, key, provider, elapsed):
+        frame, stack = self._stack.get()
+        self._stack.set(stack)
+        dependencies_time = frame[1]
+        parent = stack[0] if stack is not None else None
+        if parent is not None:
+            parent[1] += elapsed
+
+        with self._lock:
+            stats = self._get_stats(key)
+            stats.count += 1
+            stats.total_time += elapsed
+            stats.self_time += elapsed - dependencies_time
+            if elapsed > stats.max_time:
+                stats.max_time = elapsed
+
+            if parent is not None:
+                dependencies = self._get_stats(parent[0]).dependencies
+                dependencies[key] = dependencies.get(key, 0.0) + elapsed
+
+    def report(self, limit=None):
+        """
+        Formats collected statistics as a text table of keys sorted by cumulative time, each followed by
+        the breakdown of time spent on its dependencies.
+
+        :param limit: Maximum number of keys in the report.
+        :return: str with the report.
+        """
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda item: item[1].total_time, reverse=True)[:limit]
+            lines = ['%-40s %8s %12s %12s %12s' % ('key', 'calls', 'total ms', 'self ms', 'max ms')]
+            for key, stats in items:
+                lines.append('%-40s %8d %12.3f %12.3f %12.3f' % (
+                    key, stats.count, stats.total_time * 1e3, stats.self_time * 1e3, stats.max_time * 1e3))
+                for dependency, time in sorted(stats.dependencies.items(), key=lambda item: item[1], reverse=True):
+                    lines.append('    %-36s %8s %12.3f' % (dependency, '', time * 1e3))
+
+        return '\n'.join(lines)
+
+    def _get_stats(self, key):
+        try:
+            return self._stats[key]
+        except KeyError:
+            stats = self._stats[key] = KeyStats()
+            return stats
+
+
+class _ThreadLocalVar(threading.local):
+    # minimal ContextVar replacement for Python versions without contextvars
+    value = None
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+def profile_factory(key, provider, factory, hooks):
+    """
+    Wraps a factory of the provider registered under the key, so the hooks are called around every call.
+
+    :return: Callable without arguments.
+    """
+    before = hooks.before_get_instance
+    after = hooks.after_get_instance
+
+    def profiled_factory():
+        before(key, provider)
+        start = default_timer()
+        try:
+            return factory()
+        finally:
+            after(key, provider, default_timer() - start)
+
+    return profiled_factory
@@ -1,12 +1,33 @@
 # coding=utf-8
 from __future__ import absolute_import
-from future.standard_library import install_aliases
-
-install_aliases()
 
+import copy
 import inspect
-import six
-import abc
+import itertools
+import threading
+import weakref
+
+from collections import namedtuple
+from timeit import default_timer
+
+from pyioc._compat import PY2, PY3
+from pyioc.locators import AmbiguousKeyError
+from pyioc.scopes import Scope, ScopeError
+
+
+if PY2:
+    _getargspec = inspect.getargspec
+else:
+    _getargspec = inspect.getfullargspec
+
+
+_NOT_CREATED = object()
+
+_construction_counter = itertools.count()
+
+
+def _dead_ref():
+    return None
 
 
 class SignatureError(TypeError):
@@ -14,10 +35,10 @@ class SignatureError(TypeError):
 
 
 def _check_if_init_implemented(obj):
-    if six.PY2:
+    if PY2:
         if inspect.ismethod(obj.__init__):
             return True
-    if six.PY3:
+    if PY3:
         if inspect.isfunction(obj.__init__):
             return True
 
@@ -36,7 +57,7 @@ def validate_if_callable_without_args(obj):
     else:
         obj_to_inspect = obj
 
-    spec = inspect.getargspec(obj_to_inspect)
+    spec = _getargspec(obj_to_inspect)
     args = spec.args
     par_len = len(args)
     if par_len > 1:
@@ -46,90 +67,919 @@ def validate_if_callable_without_args(obj):
             raise SignatureError('callable cant have arguments')
 
 
-@six.add_metaclass(abc.ABCMeta)
+Dependency = namedtuple('Dependency', ('name', 'keys', 'keyword', 'optional'))
+"""
+Namedtuple describing a single parameter of a callable - its name, keys under which its value may be registered
+(the name first, then the type annotation), whether it is passed as a keyword argument and whether it has a default.
+"""
+
+_SKIP = object()
+
+
+class _Selection(list):
+    """
+    List of selected (key, keyword) pairs. *keys* holds the keys when all of them are passed positionally (None
+    otherwise) and *defaults* holds (index in args, value) pairs of skipped positional-only parameters, which have
+    to be passed explicitly because a later positional-only parameter is passed.
+    """
+    __slots__ = ('keys', 'defaults')
+
+
+class DependencyPlan(object):
+    """
+    Parsed signature of a callable, computed once and used on every build of an object.
+
+    Selections of keys without context are cached by the container until the next registration, so plans with
+    optional or annotated parameters don't probe the registrations on every build.
+    """
+    __slots__ = ('dependencies', 'names', 'keys', '_static_selection', '_positional_defaults')
+
+    def __init__(self, dependencies, positional_defaults=None):
+        """
+        :param dependencies: Sequence of Dependency tuples.
+        :param positional_defaults: Defaults of positional-only parameters with defaults, by parameter name.
+        """
+        self.dependencies = tuple(dependencies)
+        self.names = tuple(dependency.name for dependency in self.dependencies)
+        self._positional_defaults = positional_defaults or {}
+
+        if all(len(d.keys) == 1 and not d.keyword and not d.optional for d in self.dependencies):
+            self.keys = tuple(dependency.keys[0] for dependency in self.dependencies)
+            self._static_selection = tuple((key, None) for key in self.keys)
+        else:
+            self.keys = None
+            self._static_selection = None
+
+    def select(self, container, context=None):
+        """
+        Selects keys to resolve for the parameters. Parameters with defaults are skipped when there is no object for
+        any of their keys.
+
+        :param container: Container from which the dependencies will be resolved.
+        :param context: Dictionary of objects overriding registrations.
+        :return: Sequence of (key, keyword) pairs, where keyword is None for positional arguments. Dynamic
+            selections also have *keys* - tuple of the keys when all are passed positionally, otherwise None.
+        """
+        if self._static_selection is not None:
+            return self._static_selection
+
+        if context:
+            return self._select(container, context)
+
+        try:
+            return container._selections[self]
+        except KeyError:
+            selected = container._selections[self] = self._select(container, None)
+            return selected
+        except (AttributeError, TypeError):
+            # containers without the cache of selections
+            return self._select(container, None)
+
+    def _select(self, container, context):
+        selected = []
+        defaults = []
+        skipped = []
+        positional = 0
+        for dependency in self.dependencies:
+            key = _select_key(dependency, container, context)
+            if key is _SKIP:
+                if dependency.name in self._positional_defaults:
+                    skipped.append(self._positional_defaults[dependency.name])
+                continue
+
+            if not dependency.keyword:
+                # a positional argument follows skipped positional-only ones, so their defaults are passed
+                for value in skipped:
+                    defaults.append((positional, value))
+                    positional += 1
+                del skipped[:]
+                positional += 1
+
+            selected.append((key, dependency.name if dependency.keyword else None))
+
+        selected = _Selection(selected)
+        selected.defaults = tuple(defaults)
+        if defaults or any(keyword is not None for key, keyword in selected):
+            selected.keys = None
+        else:
+            selected.keys = tuple(key for key, keyword in selected)
+
+        return selected
+
+    @staticmethod
+    def split(selected, values):
+        """
+        Splits resolved values of selected keys into positional and keyword arguments.
+
+        :return: Tuple of args list and kwargs dictionary.
+        """
+        args = []
+        kwargs = {}
+        for (key, keyword), value in zip(selected, values):
+            if keyword is None:
+                args.append(value)
+            else:
+                kwargs[keyword] = value
+
+        for index, value in getattr(selected, 'defaults', ()):
+            args.insert(index, value)
+
+        return args, kwargs
+
+
+def needs_split(selected):
+    """
+    Checks if arguments of the selection have to be passed through DependencyPlan.split() - some are passed
+    by keyword or defaults of skipped positional-only parameters have to be inserted.
+    """
+    if isinstance(selected, _Selection):
+        return selected.keys is None
+    return any(keyword is not None for key, keyword in selected)
+
+
+def _select_key(dependency, container, context):
+    keys = dependency.keys
+    if len(keys) == 1 and not dependency.optional:
+        return keys[0]
+
+    for key in keys:
+        if container.is_resolvable(key, context):
+            return key
+
+    if dependency.optional:
+        return _SKIP
+
+    # required parameter annotated with a base class of many registered classes - resolving it raises the error
+    for key in keys[1:]:
+        if _is_ambiguous(container, key):
+            return key
+
+    return keys[0]
+
+
+def _is_ambiguous(container, key):
+    locator = getattr(container, '_locator', None)
+    if locator is None:
+        return False
+    try:
+        locator.locate(key)
+    except AmbiguousKeyError:
+        return True
+    except LookupError:
+        return False
+    return False
+
+
+def get_dependency_plan(callable_object):
+    """
+    Computes the dependency plan for a callable - parameters that have to be resolved from the container before
+    calling it. Variable arguments and the *self* argument are omitted.
+
+    :param callable_object: Class or function to inspect.
+    :return: DependencyPlan instance.
+    """
+    if inspect.isclass(callable_object):
+        if not _check_if_init_implemented(callable_object):
+            return DependencyPlan(())
+        return DependencyPlan(*_parse_parameters(callable_object.__init__, skip_first=True))
+
+    return DependencyPlan(*_parse_parameters(callable_object))
+
+
+def get_dependencies(callable_object):
+    """
+    Names of arguments that have to be resolved from the container before calling the callable.
+
+    :param callable_object: Class or function to inspect.
+    :return: Tuple with names of arguments (without *self*).
+    """
+    return get_dependency_plan(callable_object).names
+
+
+def _parse_parameters(obj, skip_first=False):
+    if PY2:
+        return _parse_argspec(obj, skip_first)
+
+    parameters = list(inspect.signature(obj).parameters.values())
+    if skip_first:
+        parameters = parameters[1:]
+
+    hints = {}
+    if any(isinstance(parameter.annotation, str) for parameter in parameters):
+        hints = _get_type_hints(obj)
+
+    dependencies = []
+    positional_defaults = {}
+    keyword = False
+    for parameter in parameters:
+        if parameter.kind in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD) or parameter.name == 'self':
+            continue
+
+        optional = parameter.default is not parameter.empty
+        if optional and parameter.kind == parameter.POSITIONAL_ONLY:
+            positional_defaults[parameter.name] = parameter.default
+        if optional or parameter.kind == parameter.KEYWORD_ONLY:
+            # once an argument may be skipped, the following ones have to be passed by name
+            keyword = True
+
+        annotation = hints.get(parameter.name, parameter.annotation)
+        if inspect.isclass(annotation) and annotation is not parameter.empty:
+            keys = (parameter.name, annotation)
+        else:
+            keys = (parameter.name,)
+
+        dependencies.append(Dependency(parameter.name, keys, keyword and parameter.kind != parameter.POSITIONAL_ONLY,
+                                       optional))
+
+    return dependencies, positional_defaults
+
+
+def _parse_argspec(obj, skip_first):
+    spec = inspect.getargspec(obj)
+    first_optional = len(spec.args) - len(spec.defaults or ())
+
+    dependencies = []
+    for index, name in enumerate(spec.args):
+        if (skip_first and index == 0) or name == 'self':
+            continue
+
+        optional = index >= first_optional
+        dependencies.append(Dependency(name, (name,), optional, optional))
+
+    return dependencies, {}
+
+
+def _get_type_hints(obj):
+    try:
+        import typing
+        return typing.get_type_hints(obj)
+    except Exception:
+        return {}
+
+
+def is_coroutine_function(obj):
+    """
+    Checks if the object is a coroutine function. Always False on Python versions without native coroutines.
+    """
+    check = getattr(inspect, 'iscoroutinefunction', None)
+    return check is not None and check(obj)
+
+
 class ProviderBase(object):
-    @abc.abstractmethod
+    """
+    Base class of providers. Providers are created for every registration, so all of them define __slots__.
+    Providers of objects created by coroutine functions set is_async and implement get_instance_async().
+    """
+    __slots__ = ()
+    is_async = False
+
     def get_instance(self, context=None):
-        pass
+        raise NotImplementedError()
+
+    def get_factory(self):
+        """
+        Returns a callable without arguments returning the same instances as get_instance() called without context.
+        Providers override it to return a flattened factory that skips the generic resolution path.
+
+        :return: Callable without arguments.
+        """
+        return self.get_instance
 
 
 class ObjectProvider(ProviderBase):
+    __slots__ = ('_obj',)
+
     def __init__(self, obj):
         self._obj = obj
 
     def get_instance(self, context=None):
         return self._obj
 
+    def get_factory(self):
+        obj = self._obj
+        return lambda: obj
+
 
 class NewInstancesProvider(ProviderBase):
+    __slots__ = ('_callable_object',)
+
     def __init__(self, callable_object):
         validate_if_callable_without_args(callable_object)
         self._callable_object = callable_object
 
+    @property
+    def callable_object(self):
+        """
+        Callable creating the objects.
+        """
+        return self._callable_object
+
     def get_instance(self, context=None):
         return self._callable_object()
 
+    def get_factory(self):
+        return self._callable_object
+
+
+class _SingleInstanceMixin(object):
+    """
+    Stores the single instance together with its construction order, so containers can dispose instances in reverse
+    order of construction.
+    """
+    __slots__ = ()
+
+    @property
+    def is_created(self):
+        """
+        True when the instance was already created.
+        """
+        return self._instance is not _NOT_CREATED
+
+    @property
+    def construction_order(self):
+        """
+        Sequence number of construction of the held instance (increasing across all providers), None when there is
+        no instance.
+        """
+        return self._order
+
+    def release(self):
+        """
+        Drops the held instance, so a new one is created on the next call.
+
+        :return: Released instance, None when there was no instance.
+        """
+        instance = self._instance
+        self._instance = _NOT_CREATED
+        self._order = None
+        return None if instance is _NOT_CREATED else instance
+
+    def _store_instance(self, instance):
+        self._order = next(_construction_counter)
+        self._instance = instance
+        return instance
+
+
+class LazySingleInstanceProvider(_SingleInstanceMixin, ProviderBase):
+    __slots__ = ('_instance', '_callable_object', '_order')
 
-class LazySingleInstanceProvider(ProviderBase):
     def __init__(self, callable_object):
         validate_if_callable_without_args(callable_object)
-        self._instance = None
+        self._instance = _NOT_CREATED
         self._callable_object = callable_object
+        self._order = None
 
     def get_instance(self, context=None):
-        if not self._instance:
-            self._instance = self._callable_object()
-        return self._instance
+        instance = self._instance
+        if instance is _NOT_CREATED:
+            instance = self._store_instance(self._callable_object())
+        return instance
 
 
-class EagerSingleInstanceProvider(ProviderBase):
+class ThreadSafeLazySingleInstanceProvider(LazySingleInstanceProvider):
+    """
+    Lazy singleton provider guaranteeing that the callable is called exactly once when accessed from many threads.
+    The lock is taken only until the instance is created.
+    """
+    __slots__ = ('_lock',)
+
+    def __init__(self, callable_object):
+        super(ThreadSafeLazySingleInstanceProvider, self).__init__(callable_object)
+        self._lock = threading.Lock()
+
+    def get_instance(self, context=None):
+        instance = self._instance
+        if instance is _NOT_CREATED:
+            with self._lock:
+                instance = self._instance
+                if instance is _NOT_CREATED:
+                    instance = self._store_instance(self._callable_object())
+        return instance
+
+
+class ScopedProvider(ProviderBase):
+    """
+    Provider creating one instance per scope. Can be used only when resolving inside a scope.
+    """
+    __slots__ = ('_callable_object',)
+
     def __init__(self, callable_object):
         validate_if_callable_without_args(callable_object)
-        self._instance = callable_object()
+        self._callable_object = callable_object
 
     def get_instance(self, context=None):
-        return self._instance
+        if not isinstance(context, Scope):
+            raise ScopeError('Scoped object can be resolved only inside a scope')
+        return context.get_or_create(self, self._callable_object)
+
+
+class EagerSingleInstanceProvider(_SingleInstanceMixin, ProviderBase):
+    """
+    Singleton provider creating the instance on creation of the provider. After the instance is released,
+    a new one is created on the next call.
+    """
+    __slots__ = ('_instance', '_callable_object', '_order')
+
+    def __init__(self, callable_object):
+        validate_if_callable_without_args(callable_object)
+        self._callable_object = callable_object
+        self._store_instance(callable_object())
+
+    def get_instance(self, context=None):
+        instance = self._instance
+        if instance is _NOT_CREATED:
+            instance = self._store_instance(self._callable_object())
+        return instance
+
+    def get_factory(self):
+        instance = self._instance
+        if instance is _NOT_CREATED:
+            return self.get_instance
+        return lambda: instance
+
+
+_EXPIRING_SLOTS = ('_seconds', '_refresh_in_background', '_instance', '_expires', '_lock', '_refreshing', '_order')
+
+
+class _WeakInstanceMixin(object):
+    """
+    Holds only a weak reference to the instance returned from _create(), creating a new one after the previous one
+    was garbage collected.
+    """
+    __slots__ = ()
+
+    def get_instance(self, context=None):
+        instance = self._ref()
+        if instance is None:
+            instance = self._store_instance(self._create(context))
+        return instance
+
+    @property
+    def is_created(self):
+        """
+        True when the instance was created and is still alive.
+        """
+        return self._ref() is not None
+
+    @property
+    def construction_order(self):
+        """
+        Sequence number of construction of the referenced instance, None when there is no instance.
+        """
+        return self._order
+
+    def release(self):
+        """
+        Drops the reference to the instance, so a new one is created on the next call.
+
+        :return: Released instance, None when there was no alive instance.
+        """
+        instance = self._ref()
+        self._ref = _dead_ref
+        self._order = None
+        return instance
+
+    def _store_instance(self, instance):
+        try:
+            self._ref = weakref.ref(instance)
+        except TypeError:
+            # without the reference a new instance would be built on every call
+            raise TypeError('Object registered for key "%s" with the WeakSingleton lifetime must support weak '
+                            'references, got %s instance' % (self._key, type(instance).__name__))
+        self._order = next(_construction_counter)
+        return instance
+
+
+class _ExpiringInstanceMixin(object):
+    """
+    Holds the instance returned from _create() for a given number of seconds. Expired instance is rebuilt on the next
+    call, or in a background thread while the expired instance is still returned, when refresh_in_background is set.
+    """
+    __slots__ = ()
+
+    def _init_expiration(self, seconds, refresh_in_background):
+        if seconds <= 0:
+            raise ValueError('Argument "seconds" must be positive')
+
+        self._seconds = seconds
+        self._refresh_in_background = refresh_in_background
+        self._instance = _NOT_CREATED
+        self._expires = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._order = None
+
+    def get_instance(self, context=None):
+        instance = self._instance
+        if instance is not _NOT_CREATED:
+            if default_timer() < self._expires:
+                return instance
+            if self._refresh_in_background:
+                self._start_refresh()
+                return instance
+
+        with self._lock:
+            if self.is_created:
+                return self._instance
+            return self._store(self._create(context))
+
+    @property
+    def is_created(self):
+        """
+        True when the instance was created and didn't expire yet.
+        """
+        return self._instance is not _NOT_CREATED and default_timer() < self._expires
+
+    @property
+    def construction_order(self):
+        """
+        Sequence number of construction of the held (possibly expired) instance, None when there is no instance.
+        """
+        return self._order
+
+    def release(self):
+        """
+        Drops the held instance, so a new one is created on the next call.
+
+        :return: Released instance, None when there was no instance.
+        """
+        with self._lock:
+            instance = self._instance
+            self._instance = _NOT_CREATED
+            self._expires = 0
+            self._order = None
+        return None if instance is _NOT_CREATED else instance
+
+    def _store(self, instance):
+        self._expires = default_timer() + self._seconds
+        self._order = next(_construction_counter)
+        self._instance = instance
+        return instance
+
+    def _start_refresh(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        thread = threading.Thread(target=self._refresh)
+        thread.daemon = True
+        thread.start()
+
+    def _refresh(self):
+        try:
+            self._store(self._create(None))
+        except Exception:
+            # The expired instance is kept, the refresh is retried by the next call.
+            pass
+        finally:
+            self._refreshing = False
+
+
+class WeakSingleInstanceProvider(_WeakInstanceMixin, ProviderBase):
+    """
+    Singleton provider holding the instance through a weak reference, so it is created again after it was garbage
+    collected. The instance must support weak references.
+    """
+    __slots__ = ('_callable_object', '_ref', '_order', '_key')
+
+    def __init__(self, callable_object, key=None):
+        """
+        :param callable_object: Callable creating the instance.
+        :param key: Key of the registration, used in error messages.
+        """
+        validate_if_callable_without_args(callable_object)
+        self._callable_object = callable_object
+        self._ref = _dead_ref
+        self._order = None
+        self._key = key
+
+    def _create(self, context):
+        return self._callable_object()
+
+
+class TTLSingleInstanceProvider(_ExpiringInstanceMixin, ProviderBase):
+    """
+    Singleton provider creating the instance again after it expired.
+    """
+    __slots__ = ('_callable_object',) + _EXPIRING_SLOTS
+
+    def __init__(self, callable_object, seconds, refresh_in_background=False):
+        """
+        :param callable_object: Callable creating the instance.
+        :param seconds: Number of seconds after which the instance expires.
+        :param refresh_in_background: If True, expired instance is returned while a new one is created in a
+            background thread.
+        """
+        validate_if_callable_without_args(callable_object)
+        self._callable_object = callable_object
+        self._init_expiration(seconds, refresh_in_background)
+
+    def _create(self, context):
+        return self._callable_object()
 
 
 class NewInstancesWithDepsProvider(ProviderBase):
+    __slots__ = ('_callable_object', '_container', '_plan')
+
     def __init__(self, callable_object, container):
         if not callable(callable_object):
             raise TypeError('Argument "callable_object" must be a callable')
 
         self._callable_object = callable_object
         self._container = container
+        self._plan = get_dependency_plan(callable_object)
+
+    @property
+    def dependencies(self):
+        """
+        Names of arguments of the callable, computed once on creation.
+        """
+        return self._plan.names
+
+    @property
+    def plan(self):
+        """
+        Dependency plan of the callable, computed once on creation.
+        """
+        return self._plan
+
+    @property
+    def callable_object(self):
+        """
+        Callable creating the objects.
+        """
+        return self._callable_object
+
+    @property
+    def container(self):
+        """
+        Container from which the dependencies are resolved.
+        """
+        return self._container
+
+    def bind(self, container):
+        """
+        Returns a copy of the provider resolving dependencies from another container.
+
+        :param container: Container from which the dependencies will be resolved.
+        :return: New provider.
+        """
+        provider = copy.copy(self)
+        provider._container = container
+        return provider
+
+    def invalidate(self):
+        """
+        Recomputes the dependency plan. Needed only when the signature of the callable was changed after
+        the provider was created (e.g. the class was monkeypatched).
+        """
+        self._plan = get_dependency_plan(self._callable_object)
 
     def get_instance(self, context=None):
         return self._build_object(context)
 
-    def _build_object(self, context):
-        if inspect.isclass(self._callable_object):
-            if _check_if_init_implemented(self._callable_object):
-                args = inspect.getargspec(self._callable_object.__init__).args
-            else:
-                args = ()
-        else:
-            args = inspect.getargspec(self._callable_object).args
+    def get_factory(self):
+        """
+        Returns a factory calling the callable directly with factories of its dependencies compiled by the container.
+        The dependency plan is captured, so signature changes need SimpleContainer.invalidate() instead of invalidate().
+        """
+        callable_object = self._callable_object
+        selected = self._plan.select(self._container)
+        factories = tuple(self._container.get_factory(key) for key, keyword in selected)
 
-        new_args = []
-        for arg in args:
-            if arg == 'self':
-                continue
+        if needs_split(selected):
+            split = self._plan.split
 
-            new_args.append(self._container.resolve(arg, context))
+            def factory_with_keywords():
+                args, kwargs = split(selected, [factory() for factory in factories])
+                return callable_object(*args, **kwargs)
 
-        if new_args:
-            return self._callable_object(*new_args)
+            return factory_with_keywords
+
+        if not factories:
+            return callable_object
+
+        if len(factories) == 1:
+            factory = factories[0]
+            return lambda: callable_object(factory())
+
+        return lambda: callable_object(*[factory() for factory in factories])
+
+    def create_instance(self, args, kwargs=None):
+        """
+        Creates the object from already resolved dependencies.
+
+        :param args: Positional arguments selected by the dependency plan.
+        :param kwargs: Keyword arguments selected by the dependency plan.
+        :return: Created object.
+        """
+        if kwargs:
+            return self._callable_object(*args, **kwargs)
+        return self._callable_object(*args)
+
+    def _build_object(self, context):
+        plan = self._plan
+        keys = plan.keys
+        resolve = self._container.resolve
+
+        if keys is None:
+            selected = plan.select(self._container, context)
+            keys = selected.keys
+            if keys is None:
+                args, kwargs = plan.split(selected, [resolve(key, context) for key, keyword in selected])
+                return self._callable_object(*args, **kwargs)
+
+        if keys:
+            return self._callable_object(*[resolve(key, context) for key in keys])
 
         return self._callable_object()
 
 
-class LazySingleInstanceWithDepsProvider(NewInstancesWithDepsProvider):
+class LazySingleInstanceWithDepsProvider(_SingleInstanceMixin, NewInstancesWithDepsProvider):
+    __slots__ = ('_instance', '_order')
+
     def __init__(self, callable_object, container):
         super(LazySingleInstanceWithDepsProvider, self).__init__(callable_object, container)
-        self._instance = None
+        self._instance = _NOT_CREATED
+        self._order = None
 
     def get_instance(self, context=None):
-        if not self._instance:
-            self._instance = self._build_object(context)
-        return self._instance
+        instance = self._instance
+        if instance is _NOT_CREATED:
+            instance = self._store_instance(self._build_object(context))
+        return instance
+
+    def get_factory(self):
+        return self.get_instance
+
+    def create_instance(self, args, kwargs=None):
+        instance = self._instance
+        if instance is _NOT_CREATED:
+            instance = self._store_instance(
+                super(LazySingleInstanceWithDepsProvider, self).create_instance(args, kwargs))
+        return instance
+
+
+class ThreadSafeLazySingleInstanceWithDepsProvider(LazySingleInstanceWithDepsProvider):
+    """
+    Lazy singleton provider with dependencies guaranteeing that the object is built exactly once when accessed from
+    many threads. The lock is taken only until the instance is created.
+    """
+    __slots__ = ('_lock',)
+
+    def __init__(self, callable_object, container):
+        super(ThreadSafeLazySingleInstanceWithDepsProvider, self).__init__(callable_object, container)
+        self._lock = threading.Lock()
+
+    def get_instance(self, context=None):
+        instance = self._instance
+        if instance is _NOT_CREATED:
+            with self._lock:
+                instance = self._instance
+                if instance is _NOT_CREATED:
+                    instance = self._store_instance(self._build_object(context))
+        return instance
+
+    def create_instance(self, args, kwargs=None):
+        instance = self._instance
+        if instance is _NOT_CREATED:
+            with self._lock:
+                instance = super(ThreadSafeLazySingleInstanceWithDepsProvider, self).create_instance(args, kwargs)
+        return instance
+
+
+class ScopedWithDepsProvider(NewInstancesWithDepsProvider):
+    """
+    Provider building one instance with dependencies per scope. Can be used only when resolving inside a scope.
+    """
+    __slots__ = ()
+
+    def get_instance(self, context=None):
+        if not isinstance(context, Scope):
+            raise ScopeError('Scoped object can be resolved only inside a scope')
+        return context.get_or_create(self, self._build_object, context)
+
+    def get_factory(self):
+        return self.get_instance
+
+
+class WeakSingleInstanceWithDepsProvider(_WeakInstanceMixin, NewInstancesWithDepsProvider):
+    """
+    Singleton provider with dependencies holding the instance through a weak reference, so it is built again after it
+    was garbage collected. The instance must support weak references.
+    """
+    __slots__ = ('_ref', '_order', '_key')
+
+    def __init__(self, callable_object, container, key=None):
+        """
+        :param callable_object: Callable creating the instance.
+        :param container: Container from which dependencies are resolved.
+        :param key: Key of the registration, used in error messages.
+        """
+        super(WeakSingleInstanceWithDepsProvider, self).__init__(callable_object, container)
+        self._ref = _dead_ref
+        self._order = None
+        self._key = key
+
+    def get_factory(self):
+        return self.get_instance
+
+    def create_instance(self, args, kwargs=None):
+        instance = self._ref()
+        if instance is None:
+            instance = self._store_instance(
+                super(WeakSingleInstanceWithDepsProvider, self).create_instance(args, kwargs))
+        return instance
+
+    def _create(self, context):
+        return self._build_object(context)
+
+
+class TTLSingleInstanceWithDepsProvider(_ExpiringInstanceMixin, NewInstancesWithDepsProvider):
+    """
+    Singleton provider with dependencies building the instance again after it expired. Dependencies of instances
+    refreshed in background are resolved without context.
+    """
+    __slots__ = _EXPIRING_SLOTS
+
+    def __init__(self, callable_object, container, seconds, refresh_in_background=False):
+        """
+        :param callable_object: Callable building the instance.
+        :param container: Container from which the dependencies are resolved.
+        :param seconds: Number of seconds after which the instance expires.
+        :param refresh_in_background: If True, expired instance is returned while a new one is built in a
+            background thread.
+        """
+        super(TTLSingleInstanceWithDepsProvider, self).__init__(callable_object, container)
+        self._init_expiration(seconds, refresh_in_background)
+
+    def get_factory(self):
+        return self.get_instance
+
+    def create_instance(self, args, kwargs=None):
+        with self._lock:
+            if self.is_created:
+                return self._instance
+            return self._store(super(TTLSingleInstanceWithDepsProvider, self).create_instance(args, kwargs))
+
+    def _create(self, context):
+        return self._build_object(context)
+
+
+class MultiProvider(ProviderBase):
+    """
+    Provider returning a tuple of instances from all providers registered under the same key.
+
+    Once every member returns always the same instance (objects and already created singletons), the tuple is cached
+    and returned without calling the members.
+    """
+    __slots__ = ('_providers', '_instances')
+
+    def __init__(self, providers=()):
+        self._providers = tuple(providers)
+        self._instances = None
+
+    @property
+    def providers(self):
+        """
+        Tuple of member providers in order of registration.
+        """
+        return self._providers
+
+    def add(self, provider):
+        """
+        Adds a member provider.
+
+        :param provider: Provider to add.
+        """
+        self._providers += (provider,)
+        self._instances = None
+
+    def clear_cache(self):
+        """
+        Drops the cached tuple of instances, e.g. after instances of members were released.
+        """
+        self._instances = None
+
+    def get_instance(self, context=None):
+        instances = self._instances
+        if instances is not None:
+            return instances
+
+        members = self._providers
+        instances = tuple([provider.get_instance(context) for provider in members])
+        if all(_returns_same_instance(provider) for provider in members):
+            self._instances = instances
+
+        return instances
+
+
+def _returns_same_instance(provider):
+    if isinstance(provider, (ObjectProvider, EagerSingleInstanceProvider)):
+        return True
+
+    if isinstance(provider, (LazySingleInstanceProvider, LazySingleInstanceWithDepsProvider)):
+        return provider.is_created and not provider.is_async
+
+    return False
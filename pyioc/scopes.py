@@ -0,0 +1,102 @@
+# coding=utf-8
+"""
+Module containing implementation of scopes - units of work (e.g. requests) sharing instances of scoped objects.
+"""
+from __future__ import absolute_import
+
+
+class ScopeError(Exception):
+    pass
+
+
+def _dispose_instance(instance):
+    close = getattr(instance, 'close', None)
+    if callable(close):
+        close()
+        return
+
+    exit_ = getattr(instance, '__exit__', None)
+    if callable(exit_):
+        exit_(None, None, None)
+
+
+class Scope(dict):
+    """
+    Scope caching instances of objects registered with the Scoped lifetime.
+
+    Scope is passed down the resolution as the context, so items of the dictionary override registrations
+    the same way as the context does. Creating a scope doesn't copy any registrations of the container.
+    """
+    __slots__ = ('_container', '_instances', '_created')
+
+    def __init__(self, container, context=None):
+        """
+        :param container: Container from which objects are resolved.
+        :param context: Dictionary of objects overriding registrations in this scope.
+        """
+        if context:
+            super(Scope, self).__init__(context)
+        self._container = container
+        self._instances = None
+        self._created = None
+
+    def resolve(self, key):
+        """
+        Return instance registered for a given key, sharing scoped objects within this scope.
+
+        :param key: Key under which the object or callable was registered.
+        :return: Instance related to that key.
+        """
+        return self._container.resolve(key, self)
+
+    def build(self, cls):
+        """
+        Build a new instance of class cls injecting dependencies, sharing scoped objects within this scope.
+
+        :param cls: Class of which object to build.
+        :return: Built object.
+        """
+        return self._container.build(cls, self)
+
+    def get_or_create(self, provider, factory, *args):
+        """
+        Returns instance created in this scope by the provider, creating it by calling factory(*args) if needed.
+        """
+        instances = self._instances
+        if instances is None:
+            instances = self._instances = {}
+            self._created = []
+
+        try:
+            return instances[provider]
+        except KeyError:
+            pass
+
+        instance = instances[provider] = factory(*args)
+        self._created.append(instance)
+        return instance
+
+    def close(self):
+        """
+        Disposes scoped instances in reverse order of creation by calling their *close* method, or *__exit__* of
+        context managers without it.
+        """
+        created = self._created
+        self._instances = None
+        self._created = None
+
+        error = None
+        for instance in reversed(created or ()):
+            try:
+                _dispose_instance(instance)
+            except Exception as e:
+                error = error or e
+
+        if error is not None:
+            raise error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
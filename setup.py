@@ -10,10 +10,12 @@ setup(
     author='Jakub (Mr. UPGrade) Czapliński',
     author_email='itsupgradetime@gmail.com',
     description='Python IoC tools.',
+    python_requires='>=2.7, !=3.0.*, !=3.1.*, !=3.2.*',
     install_requires=[
-        'six>=1.9.0',
-        'future>=0.15.2',
-        'enum34>=1.1.1',
+        'six>=1.9.0; python_version < "3"',
+        'future>=0.15.2; python_version < "3"',
+        'enum34>=1.1.1; python_version < "3.4"',
+        'futures>=3.0.0; python_version < "3"',
     ],
     extras_require={
         'test': [
@@ -30,7 +32,6 @@ setup(
         ]
     },
     classifiers=[
-        "Programming Language :: Python :: 2.6",
         "Programming Language :: Python :: 2.7",
         "Programming Language :: Python :: 3.3",
         "Programming Language :: Python :: 3.4",
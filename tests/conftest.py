@@ -1,10 +1,17 @@
 # coding=utf-8
+import sys
 
 import pytest
 from mock import Mock
 
 from tests.fakes import TEST_CLASS_3_INSTANCE, TEST_CLASS_1_INSTANCE, TEST_CLASS_1_NAME, TEST_CLASS_3_NAME
 
+collect_ignore = []
+if sys.version_info < (3, 5):
+    collect_ignore.append('unit_tests/test_aio.py')
+if sys.version_info < (3, 7):
+    collect_ignore.append('unit_tests/test_signatures.py')
+
 
 @pytest.fixture
 def mock_locator():
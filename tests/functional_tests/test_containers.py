@@ -1,10 +1,38 @@
 # coding=utf-8
+import functools
+import threading
+import time
 
-from pyioc.locators import ObjectLocator
-from pyioc.containers import SimpleContainer, NamespacedContainer, InstanceLifetime
+import pytest
+from mock import patch
+
+from pyioc.locators import ObjectLocator, TypeLocator, AmbiguousKeyError
+from pyioc.containers import SimpleContainer, NamespacedContainer, InstanceLifetime, TTLSingleton, \
+    DependencyCycleError, FrozenContainerError, MissingDependencyError, DisposalTimeoutError
+from pyioc.providers import LazySingleInstanceProvider
+from pyioc.scopes import ScopeError
 from tests.fakes import TEST_CLASS_1_NAME, TestClass1, TEST_FUNC_1_NAME, TestFunc1, TestClass2, TEST_CLASS_2_NAME
 
 
+class Resource(object):
+    def __init__(self, name, closed, on_close=None):
+        self.name = name
+        self._closed = closed
+        self._on_close = on_close
+
+    def close(self):
+        if self._on_close is not None:
+            self._on_close()
+        self._closed.append(self.name)
+
+
+def resource_factory(name, closed, on_close=None):
+    def factory(**dependencies):
+        return Resource(name, closed, on_close)
+
+    return factory
+
+
 class Test_SimpleContainer(object):
     @classmethod
     def get_container(cls):
@@ -79,6 +107,960 @@ class Test_SimpleContainer(object):
 
         assert isinstance(ret, TestClass2)
 
+    def test_if_compiled_container_resolves_deep_dependency_graph(self):
+        class ClassWithDeps(object):
+            def __init__(self, a, b):
+                self.a = a
+                self.b = b
+
+        class ClassWithNestedDeps(object):
+            def __init__(self, deps, b):
+                self.deps = deps
+                self.b = b
+
+        container_class = self.get_container()
+        container = container_class()
+
+        container.register_object('a', 'simple_string')
+        container.register_callable('b', TestClass1, lifetime=InstanceLifetime.Singleton)
+        container.register_callable_with_deps('deps', ClassWithDeps)
+        container.register_callable_with_deps('nested', ClassWithNestedDeps)
+        container.compile()
+
+        ret1 = container.resolve('nested')
+        ret2 = container.resolve('nested')
+
+        assert isinstance(ret1, ClassWithNestedDeps)
+        assert ret1.deps.a == 'simple_string'
+        assert ret1.deps.b is ret1.b
+        assert ret1 is not ret2
+        assert ret1.deps is not ret2.deps
+        assert ret1.b is ret2.b
+
+    def test_if_compiled_container_does_not_use_locator(self):
+        locator = ObjectLocator()
+        container_class = self.get_container()
+        container = container_class(locator=locator)
+        container.register_callable(TEST_CLASS_1_NAME, TestClass1)
+        container.compile()
+
+        with patch.object(ObjectLocator, 'locate', None):
+            ret = container.resolve(TEST_CLASS_1_NAME)
+
+        assert isinstance(ret, TestClass1)
+
+    def test_if_compiled_factories_are_invalidated_on_register(self):
+        class ClassWithDeps(object):
+            def __init__(self, a):
+                self.a = a
+
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable_with_deps('deps', ClassWithDeps)
+
+        with pytest.raises(KeyError):
+            container.resolve('deps')
+
+        container.register_object('a', 'simple_string')
+
+        ret = container.resolve('deps')
+
+        assert ret.a == 'simple_string'
+
+    def test_if_invalidate_recompiles_factories_with_new_signature(self):
+        class A(object):
+            def __init__(self, x):
+                self.args = (x,)
+
+        container_class = self.get_container()
+        container = container_class()
+        container.register_object('x', 'x')
+        container.register_object('y', 'y')
+        container.register_callable_with_deps('a', A)
+        container.register_callable_with_deps('b', lambda a, y: a)
+        child = container.create_child()
+        container.compile()
+        container.resolve('b', context={'y': 'context'})
+        child.resolve('a')
+
+        def new_init(self, x, y):
+            self.args = (x, y)
+
+        A.__init__ = new_init
+        container.invalidate()
+
+        assert container.resolve('a').args == ('x', 'y')
+        assert container.resolve('b').args == ('x', 'y')
+        assert container.resolve('b', context={'y': 'context'}).args == ('x', 'context')
+        assert child.resolve('a').args == ('x', 'y')
+
+    def test_if_invalidate_recomputes_plan_of_given_key(self):
+        class A(object):
+            def __init__(self):
+                self.args = ()
+
+        container_class = self.get_container()
+        container = container_class()
+        container.register_object('x', 'x')
+        container.register_callable_with_deps('a', A)
+        container.resolve('a')
+
+        def new_init(self, x):
+            self.args = (x,)
+
+        A.__init__ = new_init
+        container.invalidate('a')
+
+        assert container.resolve('a').args == ('x',)
+
+    def test_if_compile_finishes_on_cyclic_dependencies(self):
+        def func_a(b):
+            return b
+
+        def func_b(a):
+            return a
+
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable_with_deps('a', func_a)
+        container.register_callable_with_deps('b', func_b)
+
+        container.compile()
+
+        with pytest.raises(RuntimeError):
+            container.resolve('a')
+
+    def test_if_warm_up_creates_singletons_in_dependency_order(self):
+        created = []
+
+        def factory(name):
+            def create():
+                created.append(name)
+                return name
+            return create
+
+        def per_call(c):
+            return c
+
+        def singleton(b):
+            created.append('a')
+            return b
+
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable_with_deps('a', singleton, lifetime=InstanceLifetime.Singleton)
+        container.register_callable_with_deps('b', per_call)
+        container.register_callable('c', factory('c'), lifetime=InstanceLifetime.Singleton)
+        container.register_callable('d', factory('d'))
+
+        times = container.warm_up()
+
+        assert sorted(times.keys()) == ['a', 'c']
+        assert created == ['c', 'a']
+        assert container.resolve('a') == 'c'
+        assert created == ['c', 'a']
+
+    def test_if_warm_up_creates_independent_singletons_concurrently(self):
+        event = threading.Event()
+
+        def wait_for_event():
+            return event.wait(1)
+
+        def set_event():
+            event.set()
+            return True
+
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('a', wait_for_event, lifetime=InstanceLifetime.Singleton)
+        container.register_callable('b', set_event, lifetime=InstanceLifetime.Singleton)
+
+        container.warm_up(max_workers=2)
+
+        assert container.resolve('a') is True
+
+    def test_if_warm_up_creates_only_given_keys(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('a', TestClass1, lifetime=InstanceLifetime.Singleton)
+        container.register_callable('b', TestClass2, lifetime=InstanceLifetime.Singleton)
+
+        times = container.warm_up(keys=['a'])
+
+        assert list(times.keys()) == ['a']
+
+    def test_if_warm_up_creates_singletons_registered_with_multiple(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('plugins', TestClass1, lifetime=InstanceLifetime.Singleton, multiple=True)
+        container.register_callable('plugins', TestClass2, multiple=True)
+        container.register_callable('plugins', TestClass2, lifetime=InstanceLifetime.Singleton, multiple=True)
+
+        times = container.warm_up(keys=['plugins'])
+        singletons = [provider for provider in container._find_provider('plugins').providers
+                      if isinstance(provider, LazySingleInstanceProvider)]
+
+        assert list(times.keys()) == ['plugins']
+        assert len(singletons) == 2
+        assert all(provider.is_created for provider in singletons)
+        assert container.warm_up().keys() == times.keys()
+
+    def test_if_warm_up_creates_singleton_shared_through_multiple_key_once(self):
+        calls = []
+
+        def plugin():
+            calls.append(1)
+            time.sleep(0.01)
+            return TestClass1()
+
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('plugins', plugin, lifetime=InstanceLifetime.Singleton, multiple=True)
+        container.register_callable_with_deps('a', lambda plugins: plugins, lifetime=InstanceLifetime.Singleton)
+        container.register_callable_with_deps('b', lambda plugins: plugins, lifetime=InstanceLifetime.Singleton)
+
+        container.warm_up(max_workers=2)
+
+        assert len(calls) == 1
+        assert container.resolve('a')[0] is container.resolve('b')[0]
+
+    def test_if_warm_up_raises_error_on_cyclic_singletons(self):
+        def func_a(b):
+            return b
+
+        def func_b(a):
+            return a
+
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable_with_deps('a', func_a, lifetime=InstanceLifetime.Singleton)
+        container.register_callable_with_deps('b', func_b, lifetime=InstanceLifetime.Singleton)
+
+        with pytest.raises(DependencyCycleError):
+            container.warm_up()
+
+    def test_if_scoped_objects_are_shared_within_scope(self):
+        class Service(object):
+            def __init__(self, session, b):
+                self.session = session
+                self.b = b
+
+        class Session(object):
+            def __init__(self):
+                self.closed = False
+
+            def close(self):
+                self.closed = True
+
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('session', Session, lifetime=InstanceLifetime.Scoped)
+        container.register_callable('b', TestClass1)
+        container.register_callable_with_deps('service', Service, lifetime=InstanceLifetime.Scoped)
+        container.register_callable_with_deps('handler', Service)
+
+        with container.create_scope() as scope:
+            service1 = scope.resolve('service')
+            service2 = scope.resolve('service')
+            handler = scope.resolve('handler')
+
+        with container.create_scope() as other_scope:
+            service3 = other_scope.resolve('service')
+
+        assert service1 is service2
+        assert handler.session is service1.session
+        assert service3 is not service1
+        assert service1.session.closed
+        assert service3.session.closed
+
+    def test_if_scoped_object_can_not_be_resolved_outside_scope(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('session', TestClass1, lifetime=InstanceLifetime.Scoped)
+
+        with pytest.raises(ScopeError):
+            container.resolve('session')
+
+    def test_if_scope_context_overrides_registrations(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('a', TestClass1)
+
+        scope = container.create_scope(context={'a': 'override'})
+
+        assert scope.resolve('a') == 'override'
+
+    def test_if_resolve_many_returns_instances_in_order_of_keys(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_object('a', 'simple_string')
+        container.register_callable('b', TestClass1)
+        container.register_callable('c', TestClass2, lifetime=InstanceLifetime.Singleton)
+
+        a, b, c = container.resolve_many(['a', 'b', 'c'])
+        ret = container.resolve_many(['c', 'a'], context={'a': 'override'})
+
+        assert a == 'simple_string'
+        assert isinstance(b, TestClass1)
+        assert isinstance(c, TestClass2)
+        assert ret == (c, 'override')
+
+    def test_if_resolve_many_shares_per_call_instances_when_requested(self):
+        class ClassWithDeps(object):
+            def __init__(self, b):
+                self.b = b
+
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('b', TestClass1)
+        container.register_callable_with_deps('deps1', ClassWithDeps)
+        container.register_callable_with_deps('deps2', ClassWithDeps, lifetime=InstanceLifetime.Singleton)
+
+        deps1, deps2, b = container.resolve_many(['deps1', 'deps2', 'b'], share_instances=True)
+        not_shared = container.resolve_many(['deps1', 'b'])
+
+        assert deps1.b is deps2.b
+        assert deps1.b is b
+        assert deps2 is container.resolve('deps2')
+        assert not_shared[0].b is not not_shared[1]
+
+    def test_if_resolve_many_with_shared_instances_uses_context(self):
+        class ClassWithDeps(object):
+            def __init__(self, b):
+                self.b = b
+
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('b', TestClass1)
+        container.register_callable_with_deps('deps', ClassWithDeps)
+
+        deps, b = container.resolve_many(['deps', 'b'], context={'b': 'override'}, share_instances=True)
+
+        assert deps.b == 'override'
+        assert b == 'override'
+
+    def test_if_container_with_type_locator_resolves_base_class_to_subclass(self):
+        class Repository(object):
+            pass
+
+        class SqlRepository(Repository):
+            pass
+
+        container_class = self.get_container()
+        container = container_class(locator=TypeLocator())
+        container.register_callable(SqlRepository, SqlRepository, lifetime=InstanceLifetime.Singleton)
+
+        ret1 = container.resolve(Repository)
+        ret2 = container.resolve(SqlRepository)
+
+        assert isinstance(ret1, SqlRepository)
+        assert ret1 is ret2
+
+    def test_if_ambiguous_base_class_is_not_resolvable(self):
+        class Repository(object):
+            pass
+
+        class SqlRepository(Repository):
+            pass
+
+        class MemoryRepository(Repository):
+            pass
+
+        container_class = self.get_container()
+        container = container_class(locator=TypeLocator())
+        container.register_callable(SqlRepository, SqlRepository)
+        container.register_callable(MemoryRepository, MemoryRepository)
+
+        assert not container.is_resolvable(Repository)
+        with pytest.raises(AmbiguousKeyError):
+            container.resolve(Repository)
+
+    def test_if_resolve_all_returns_all_instances_registered_for_key(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('plugins', TestClass1, multiple=True)
+        container.register_callable('plugins', TestClass2, lifetime=InstanceLifetime.Singleton, multiple=True)
+        container.register_object('plugins', 'plugin', multiple=True)
+
+        ret = container.resolve_all('plugins')
+
+        assert len(ret) == 3
+        assert isinstance(ret[0], TestClass1)
+        assert isinstance(ret[1], TestClass2)
+        assert ret[2] == 'plugin'
+
+    def test_if_all_instances_are_injected_for_multiple_registrations(self):
+        class Dispatcher(object):
+            def __init__(self, plugins):
+                self.plugins = plugins
+
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('plugins', TestClass1, lifetime=InstanceLifetime.Singleton, multiple=True)
+        container.register_callable('plugins', TestClass2, lifetime=InstanceLifetime.Singleton, multiple=True)
+        container.register_callable_with_deps('dispatcher', Dispatcher)
+
+        ret1 = container.resolve('dispatcher')
+        ret2 = container.resolve('dispatcher')
+
+        assert ret1 is not ret2
+        assert ret1.plugins is ret2.plugins
+        assert ret1.plugins == container.resolve_all('plugins')
+
+    def test_if_resolve_all_returns_single_registration_as_tuple(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_object('plugin', 'plugin')
+
+        assert container.resolve_all('plugin') == ('plugin',)
+
+    def test_if_registering_multiple_for_single_registration_raises_error(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_object('plugin', 'plugin')
+
+        with pytest.raises(KeyError):
+            container.register_object('plugin', 'plugin', multiple=True)
+
+    def test_if_registering_single_for_multiple_registration_raises_error(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_object('plugins', 'plugin', multiple=True)
+
+        with pytest.raises(KeyError):
+            container.register_object('plugins', 'plugin')
+
+    def test_if_frozen_container_resolves_registered_objects(self):
+        class ClassWithDeps(object):
+            def __init__(self, a, b):
+                self.a = a
+                self.b = b
+
+        container_class = self.get_container()
+        container = container_class()
+        container.register_object('a', 'simple_string')
+        container.register_callable('b', TestClass1, lifetime=InstanceLifetime.Singleton)
+        container.register_callable_with_deps('deps', ClassWithDeps)
+
+        frozen = container.freeze()
+        ret1 = frozen.resolve('deps')
+        ret2 = frozen.resolve('deps', context={'a': 'override'})
+
+        assert frozen.frozen
+        assert sorted(frozen.get_keys()) == ['a', 'b', 'deps']
+        assert ret1.a == 'simple_string'
+        assert ret1.b is container.resolve('b')
+        assert ret2.a == 'override'
+        assert ret2.b is ret1.b
+
+    def test_if_frozen_container_rejects_registrations(self):
+        container_class = self.get_container()
+        container = container_class()
+        frozen = container.freeze()
+
+        with pytest.raises(FrozenContainerError):
+            frozen.register_object('a', 'a')
+
+        with pytest.raises(FrozenContainerError):
+            container.register_callable('b', TestClass1)
+
+        assert container.frozen
+
+    def test_if_freezing_child_container_freezes_its_parents(self):
+        class Svc(object):
+            def __init__(self, db, cache=None):
+                self.db = db
+                self.cache = cache
+
+        container_class = self.get_container()
+        parent = container_class()
+        parent.register_object('db', 'D')
+        child = parent.create_child()
+        child.register_callable_with_deps('svc', Svc)
+        frozen = child.freeze()
+
+        with pytest.raises(FrozenContainerError):
+            parent.register_object('cache', 'C')
+
+        assert parent.frozen
+        assert frozen.resolve('svc').cache is None
+        assert frozen.resolve('svc', {'x': 1}).cache is None
+        assert child.resolve('svc').cache is None
+
+    def test_if_frozen_container_raises_error_for_unregistered_key(self):
+        container_class = self.get_container()
+        frozen = container_class().freeze()
+
+        with pytest.raises(KeyError):
+            frozen.resolve('missing')
+
+    def test_if_frozen_container_resolves_from_many_threads(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('b', TestClass1)
+        container.register_callable('c', TestClass2, lifetime=InstanceLifetime.ThreadSafeSingleton)
+        frozen = container.freeze()
+        results = []
+
+        def resolve():
+            for _ in range(100):
+                results.append((frozen.resolve('b'), frozen.resolve('c')))
+
+        threads = [threading.Thread(target=resolve) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(results) == 800
+        assert all(isinstance(b, TestClass1) for b, c in results)
+        assert all(c is results[0][1] for b, c in results)
+
+    @pytest.mark.parametrize('lifetime', [InstanceLifetime.WeakSingleton, TTLSingleton(60)])
+    def test_if_weak_and_ttl_singletons_are_registered(self, lifetime):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('a', TestClass1, lifetime=lifetime)
+        container.register_callable_with_deps('b', TestClass2, lifetime=lifetime)
+
+        a = container.resolve('a')
+        b = container.resolve('b')
+
+        assert isinstance(a, TestClass1)
+        assert a is container.resolve('a')
+        assert isinstance(b, TestClass2)
+        assert b is container.resolve('b')
+
+    def test_if_weak_singleton_without_weak_references_raises_error_with_key(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_object('a', 'a')
+        container.register_callable_with_deps('settings', lambda a: {'a': a}, lifetime=InstanceLifetime.WeakSingleton)
+
+        with pytest.raises(TypeError) as error:
+            container.resolve('settings')
+
+        assert '"settings"' in str(error.value)
+        assert 'WeakSingleton' in str(error.value)
+
+    def test_if_profiler_collects_dependency_tree(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('child', TestClass1)
+        container.register_callable_with_deps('parent', lambda child: [child])
+        profiler = container.enable_profiling()
+
+        container.resolve('parent')
+        container.resolve('parent', context={'other': None})
+        container.build(TestClass2)
+
+        assert container.profiling_hooks is profiler
+        assert profiler.stats['parent'].count == 2
+        assert profiler.stats['child'].count == 2
+        assert set(profiler.stats['parent'].dependencies) == {'child'}
+
+    def test_if_profiling_hooks_are_not_called_when_disabled(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('a', TestClass1)
+        profiler = container.enable_profiling()
+        container.resolve('a')
+
+        container.disable_profiling()
+        container.resolve('a')
+        container.resolve('a', context={'other': None})
+
+        assert profiler.stats['a'].count == 1
+        assert container.profiling_hooks is None
+        assert 'resolve' not in vars(container)
+
+    def test_if_child_container_uses_profiling_hooks_of_parent(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('a', TestClass1)
+        profiler = container.enable_profiling()
+        child = container.create_child()
+        child.register_callable_with_deps('b', lambda a: [a])
+
+        child.resolve('b')
+
+        assert child.profiling_hooks is profiler
+        assert profiler.stats['b'].count == 1
+        assert set(profiler.stats['b'].dependencies) == {'a'}
+
+    def test_if_profiling_hooks_are_called_for_shared_instances(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('child', TestClass1)
+        container.register_callable_with_deps('parent', lambda child: [child])
+        profiler = container.enable_profiling()
+
+        container.resolve('parent')
+        parent, child = container.resolve_many(['parent', 'child'], share_instances=True)
+        container.resolve('parent', context={'other': None})
+
+        assert parent[0] is child
+        assert profiler.stats['parent'].count == 3
+        assert profiler.stats['child'].count == 3
+        assert set(profiler.stats['parent'].dependencies) == {'child'}
+
+    def test_if_validate_reports_depth_and_fan_out(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('a', TestClass1)
+        container.register_callable_with_deps('b', lambda a: a)
+        container.register_callable_with_deps('c', lambda a, b: b, lifetime=InstanceLifetime.Singleton)
+
+        report = container.validate()
+
+        assert report.dependencies == {'a': (), 'b': ('a',), 'c': ('a', 'b')}
+        assert report.depths == {'a': 1, 'b': 2, 'c': 3}
+        assert report.max_depth == 3
+        assert report.max_fan_out == 2
+        assert not report.missing
+        assert not report.cycles
+
+    def test_if_validate_detects_cycles(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable_with_deps('a', lambda b: b)
+        container.register_callable_with_deps('b', lambda c: c)
+        container.register_callable_with_deps('c', lambda a: a)
+
+        with pytest.raises(DependencyCycleError):
+            container.validate()
+
+        report = container.validate(raise_errors=False)
+
+        assert report.cycles == [('a', 'b', 'c', 'a')]
+
+    def test_if_validate_detects_missing_dependencies(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable_with_deps('a', lambda b, c: b)
+        container.register_callable_with_deps('d', lambda a, e=None: a)
+        container.register_object('c', 'c')
+
+        with pytest.raises(MissingDependencyError):
+            container.validate()
+
+        report = container.validate(raise_errors=False)
+
+        assert report.missing == {'a': ('b',)}
+        assert container.validate(provided_keys=['b']).max_depth == 3
+
+    def test_if_validate_checks_all_members_of_multiple_registrations(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('plugins', TestClass1, multiple=True)
+        container.register_callable_with_deps('plugins', lambda missing: missing, multiple=True)
+
+        report = container.validate(raise_errors=False)
+
+        assert report.missing == {'plugins': ('missing',)}
+
+    def test_if_context_overrides_are_used_deep_in_graph(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_object('leaf', 'registered')
+        container.register_callable_with_deps('middle', lambda leaf, suffix='': leaf + suffix)
+        container.register_callable_with_deps('root', lambda middle, other: (middle, other))
+        container.register_callable('other', TestClass1, lifetime=InstanceLifetime.Singleton)
+
+        ret1 = container.resolve('root', context={'leaf': 'context'})
+        ret2 = container.resolve('root', context={'leaf': 'second', 'suffix': '!'})
+        ret3 = container.resolve('root')
+
+        assert ret1[0] == 'context'
+        assert ret2[0] == 'second!'
+        assert ret3[0] == 'registered'
+        assert ret1[1] is ret2[1] is ret3[1]
+
+    def test_if_unaffected_objects_are_not_looked_up_in_context(self):
+        class CountingDict(dict):
+            lookups = 0
+
+            def __getitem__(self, key):
+                CountingDict.lookups += 1
+                return super(CountingDict, self).__getitem__(key)
+
+        container_class = self.get_container()
+        container = container_class()
+        container.register_object('leaf', 'registered')
+        container.register_callable_with_deps('a', lambda leaf: leaf)
+        container.register_callable_with_deps('b', lambda a: a)
+        container.register_callable_with_deps('c', lambda a, b: (a, b))
+        container.register_callable_with_deps('root', lambda c, b, other: (c, b))
+        container.register_callable_with_deps('other', lambda a: a)
+        context = CountingDict(other='context')
+
+        for _ in range(3):
+            ret = container.resolve('root', context)
+
+        assert ret == (('registered', 'registered'), 'registered')
+        assert CountingDict.lookups == 3
+
+    def test_if_singleton_depending_on_context_is_created_with_context(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_object('leaf', 'registered')
+        container.register_callable_with_deps('singleton', lambda leaf: [leaf], lifetime=InstanceLifetime.Singleton)
+
+        ret1 = container.resolve('singleton', context={'leaf': 'context'})
+        ret2 = container.resolve('singleton', context={'leaf': 'other'})
+
+        assert ret1 == ['context']
+        assert ret1 is ret2
+
+    def test_if_context_plans_are_invalidated_on_register(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable_with_deps('root', lambda leaf, optional=None: (leaf, optional))
+
+        assert container.resolve('root', context={'leaf': 1}) == (1, None)
+
+        container.register_object('optional', 2)
+
+        assert container.resolve('root', context={'leaf': 1}) == (1, 2)
+
+    def test_if_child_container_resolves_parent_registrations(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('a', TestClass1)
+        child = container.create_child()
+
+        ret = child.resolve('a')
+
+        assert isinstance(ret, TestClass1)
+        assert child.parent is container
+
+    def test_if_child_container_overrides_do_not_affect_parent(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_object('a', 'parent')
+        child = container.create_child()
+        child.register_object('a', 'child')
+
+        assert child.resolve('a') == 'child'
+        assert container.resolve('a') == 'parent'
+        assert child.create_child().resolve('a') == 'child'
+
+    def test_if_parent_registrations_use_child_overrides(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_object('value', 'parent')
+        container.register_callable_with_deps('per_call', lambda value: value)
+        container.register_callable_with_deps('singleton', lambda value: value, lifetime=InstanceLifetime.Singleton)
+        child = container.create_child()
+        child.register_object('value', 'child')
+
+        assert child.resolve('per_call') == 'child'
+        assert child.resolve('per_call', context={'value': 'context'}) == 'context'
+        assert container.resolve('per_call') == 'parent'
+        assert child.resolve('singleton') == 'parent'
+        assert container.resolve('singleton') is child.resolve('singleton')
+
+    def test_if_child_container_sees_later_parent_registrations(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_object('a', 'a')
+        child = container.create_child()
+        grandchild = child.create_child()
+        grandchild.resolve('a')
+
+        with pytest.raises(KeyError):
+            grandchild.resolve('b')
+
+        container.register_object('b', 'b')
+        child.register_object('a', 'child')
+
+        assert grandchild.resolve('b') == 'b'
+        assert grandchild.resolve('a') == 'child'
+
+    def test_if_close_disposes_singletons_in_reverse_construction_order(self):
+        closed = []
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('db', resource_factory('db', closed), lifetime=InstanceLifetime.Singleton)
+        container.register_callable_with_deps('repository', lambda db: Resource('repository', closed),
+                                              lifetime=InstanceLifetime.Singleton)
+        container.register_callable_with_deps('service', lambda repository: Resource('service', closed),
+                                              lifetime=InstanceLifetime.ThreadSafeSingleton)
+        container.register_callable('unused', resource_factory('unused', closed), lifetime=InstanceLifetime.Singleton)
+        container.register_object('registered', Resource('registered', closed))
+        container.register_callable('per_call', resource_factory('per_call', closed))
+        container.resolve('service')
+        container.resolve('per_call')
+
+        container.close()
+
+        assert closed == ['service', 'repository', 'db']
+
+    def test_if_close_disposes_dependents_registered_before_their_dependencies(self):
+        closed = []
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable_with_deps('service', lambda db: Resource('service', closed),
+                                              lifetime=InstanceLifetime.Singleton)
+        container.register_callable_with_deps('handler', lambda service: Resource('handler', closed))
+        container.register_callable_with_deps('dispatcher', lambda handler: Resource('dispatcher', closed),
+                                              lifetime=InstanceLifetime.Singleton)
+        container.register_callable('db', resource_factory('db', closed), lifetime=InstanceLifetime.Singleton)
+        container.resolve('dispatcher')
+
+        container.close()
+
+        assert closed == ['dispatcher', 'service', 'db']
+
+    def test_if_singletons_are_created_again_after_close(self):
+        closed = []
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('db', resource_factory('db', closed), lifetime=InstanceLifetime.Singleton)
+        container.register_callable_with_deps('service', lambda db: (db,), lifetime=InstanceLifetime.Singleton)
+        ret1 = container.resolve('service')
+
+        container.close()
+        ret2 = container.resolve('service')
+
+        assert closed == ['db']
+        assert ret2[0] is not ret1[0]
+        assert container.resolve('db') is ret2[0]
+
+    def test_if_close_disposes_instances_implementing_only_exit(self):
+        exits = []
+
+        class Connection(object):
+            def __exit__(self, *args):
+                exits.append(args)
+
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('connection', Connection, lifetime=InstanceLifetime.Singleton)
+        container.register_callable('plain', TestClass1, lifetime=InstanceLifetime.Singleton)
+        container.resolve('connection')
+        container.resolve('plain')
+
+        container.close()
+
+        assert exits == [(None, None, None)]
+
+    def test_if_close_disposes_independent_singletons_concurrently(self):
+        closed = []
+        started = dict(a=threading.Event(), b=threading.Event())
+
+        def wait_for(own, other):
+            def on_close():
+                started[own].set()
+                assert started[other].wait(5)
+
+            return on_close
+
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('a', resource_factory('a', closed, wait_for('a', 'b')),
+                                    lifetime=InstanceLifetime.Singleton)
+        container.register_callable('b', resource_factory('b', closed, wait_for('b', 'a')),
+                                    lifetime=InstanceLifetime.Singleton)
+        container.resolve('a')
+        container.resolve('b')
+
+        container.close()
+
+        assert sorted(closed) == ['a', 'b']
+
+    def test_if_close_raises_first_error_after_closing_remaining_instances(self):
+        closed = []
+
+        def fail():
+            raise ValueError('failed')
+
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('db', resource_factory('db', closed), lifetime=InstanceLifetime.Singleton)
+        container.register_callable_with_deps('service', lambda db: Resource('service', closed, fail),
+                                              lifetime=InstanceLifetime.Singleton)
+        container.resolve('service')
+
+        with pytest.raises(ValueError):
+            container.close()
+
+        assert closed == ['db']
+
+    def test_if_close_stops_waiting_for_slow_instances(self):
+        closed = []
+        release = threading.Event()
+
+        def slow_close():
+            release.wait(5)
+
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('db', resource_factory('db', closed), lifetime=InstanceLifetime.Singleton)
+        container.register_callable_with_deps('service', lambda db: Resource('service', closed, slow_close),
+                                              lifetime=InstanceLifetime.Singleton)
+        container.resolve('service')
+
+        start = time.time()
+        try:
+            with pytest.raises(DisposalTimeoutError):
+                container.close(timeout=0.05)
+        finally:
+            release.set()
+
+        assert time.time() - start < 1
+        assert 'db' in closed
+
+    def test_if_child_container_closes_only_own_singletons(self):
+        closed = []
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('parent', resource_factory('parent', closed), lifetime=InstanceLifetime.Singleton)
+        child = container.create_child()
+        child.register_callable_with_deps('child', lambda parent: Resource('child', closed),
+                                          lifetime=InstanceLifetime.Singleton)
+        ret = child.resolve('parent')
+        child.resolve('child')
+
+        child.close()
+
+        assert closed == ['child']
+        assert child.resolve('parent') is ret
+
+    def test_if_frozen_container_resolves_new_singletons_after_close(self):
+        closed = []
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('db', resource_factory('db', closed), lifetime=InstanceLifetime.Singleton)
+        frozen = container.freeze()
+        ret = frozen.resolve('db')
+
+        frozen.close()
+
+        assert closed == ['db']
+        assert frozen.resolve('db') is not ret
+
+
+class Test_SimpleContainerWithCodegen(Test_SimpleContainer):
+    @classmethod
+    def get_container(cls):
+        return functools.partial(SimpleContainer, codegen=True)
+
+    def test_if_generated_factories_create_new_objects_per_call(self):
+        container_class = self.get_container()
+        container = container_class()
+        container.register_callable('a', TestClass1)
+        container.register_callable('s', TestClass2, lifetime=InstanceLifetime.Singleton)
+        container.register_callable_with_deps('b', lambda a, s: (a, s))
+        container.register_callable_with_deps('c', lambda b, a: (b, a))
+
+        ret1 = container.resolve('c')
+        ret2 = container.resolve('c')
+
+        assert ret1[0][0] is not ret2[0][0]
+        assert ret1[0][0] is not ret1[1]
+        assert ret1[0][1] is ret2[0][1]
+
 
 class Test_NamespaceContainer(Test_SimpleContainer):
     @classmethod
@@ -133,3 +1115,196 @@ class Test_NamespaceContainer(Test_SimpleContainer):
         ret = container.resolve('repo__test1')
 
         assert isinstance(ret, TestClass1)
+
+    def test_if_namespaced_key_is_routed_directly_to_sub_container_provider(self):
+        container_class = self.get_container()
+        container = container_class('root')
+        sub_container = SimpleContainer('sub')
+        sub_container.register_callable(TEST_CLASS_1_NAME, TestClass1)
+        container.add_sub_container(sub_container)
+
+        container.resolve('sub__%s' % TEST_CLASS_1_NAME, context={'other': 1})
+        sub_container.resolve = None
+
+        ret1 = container.resolve('sub__%s' % TEST_CLASS_1_NAME)
+        ret2 = container.resolve('sub__%s' % TEST_CLASS_1_NAME, context={'other': 1})
+
+        assert isinstance(ret1, TestClass1)
+        assert isinstance(ret2, TestClass1)
+
+    def test_if_namespaced_key_registered_after_failed_lookup_is_resolved(self):
+        container_class = self.get_container()
+        container = container_class('root')
+        sub_container = SimpleContainer('sub')
+        container.add_sub_container(sub_container)
+
+        with pytest.raises(KeyError):
+            container.resolve('sub__%s' % TEST_CLASS_1_NAME)
+
+        sub_container.register_callable(TEST_CLASS_1_NAME, TestClass1)
+
+        ret = container.resolve('sub__%s' % TEST_CLASS_1_NAME)
+
+        assert isinstance(ret, TestClass1)
+
+    def test_if_context_overrides_namespaced_key(self):
+        container_class = self.get_container()
+        container = container_class('root')
+        sub_container = SimpleContainer('sub')
+        sub_container.register_callable(TEST_CLASS_1_NAME, TestClass1)
+        container.add_sub_container(sub_container)
+
+        ret = container.resolve('sub__%s' % TEST_CLASS_1_NAME, context={TEST_CLASS_1_NAME: 'value'})
+
+        assert ret == 'value'
+
+    def test_if_routes_follow_overrides_registered_in_sub_container(self):
+        container_class = self.get_container()
+        container = container_class('root')
+        base = SimpleContainer('base')
+        base.register_object('svc', 'parent-svc')
+        tenant = base.create_child('t')
+        container.add_sub_container(tenant)
+
+        assert container.resolve('t__svc') == 'parent-svc'
+
+        tenant.register_object('svc', 'tenant-svc')
+
+        assert tenant.resolve('svc') == 'tenant-svc'
+        assert container.resolve('t__svc') == 'tenant-svc'
+
+    def test_if_compiled_factories_follow_registrations_in_sub_container(self):
+        def svc(dep='default'):
+            return dep
+
+        container_class = self.get_container()
+        container = container_class('root')
+        sub_container = SimpleContainer('ns')
+        sub_container.register_callable_with_deps('svc', svc)
+        container.add_sub_container(sub_container)
+
+        assert container.resolve('ns__svc') == 'default'
+
+        sub_container.register_object('dep', 'registered')
+
+        assert sub_container.resolve('svc') == 'registered'
+        assert container.resolve('ns__svc') == 'registered'
+
+    def test_if_routes_are_dropped_when_sub_container_is_added(self):
+        container_class = self.get_container()
+        container = container_class('root')
+        container.register_callable_with_deps('svc', lambda ns__dep='default': ns__dep)
+
+        assert container.resolve('svc') == 'default'
+
+        sub_container = SimpleContainer('ns')
+        sub_container.register_object('dep', 'registered')
+        container.add_sub_container(sub_container)
+
+        assert container.resolve('svc') == 'registered'
+
+    def test_if_close_disposes_singletons_of_sub_containers(self):
+        closed = []
+        container_class = self.get_container()
+        container = container_class('root')
+        sub_container = SimpleContainer('s')
+        sub_container.register_callable('r', resource_factory('r', closed), lifetime=InstanceLifetime.Singleton)
+        container.add_sub_container(sub_container)
+        container.register_callable_with_deps('service', lambda s__r: Resource('service', closed),
+                                              lifetime=InstanceLifetime.Singleton)
+        ret = container.resolve('s__r')
+        container.resolve('service')
+
+        container.close()
+
+        assert closed == ['service', 'r']
+        assert container.resolve('s__r') is not ret
+        assert sub_container.resolve('r') is container.resolve('s__r')
+
+    def test_if_child_container_resolves_namespaced_dependencies(self):
+        container_class = self.get_container()
+        container = container_class('root')
+        sub_container = SimpleContainer('ns')
+        sub_container.register_object('db', 'sub-db')
+        container.add_sub_container(sub_container)
+        container.register_object('value', 'parent')
+        container.register_callable_with_deps('svc', lambda ns__db, value: (ns__db, value))
+        child = container.create_child()
+        child.register_object('value', 'child')
+
+        assert container.resolve('svc') == ('sub-db', 'parent')
+        assert child.resolve('svc') == ('sub-db', 'child')
+        assert child.resolve('ns__db') == 'sub-db'
+        assert child.resolve('svc', context={'db': 'context'}) == ('context', 'child')
+        assert child.is_resolvable('ns__db')
+
+    def test_if_routed_base_class_becomes_ambiguous_after_registration(self):
+        class Base(object):
+            pass
+
+        class First(Base):
+            pass
+
+        class Second(Base):
+            pass
+
+        container = NamespacedContainer('root', locator=TypeLocator())
+        container.register_callable(First, First)
+
+        assert isinstance(container.resolve(Base), First)
+
+        container.register_callable(Second, Second)
+
+        with pytest.raises(AmbiguousKeyError):
+            container.resolve(Base)
+
+    def test_if_resolve_many_shares_instances_per_sub_container(self):
+        container_class = self.get_container()
+        container = container_class('root')
+        sub_container = SimpleContainer('sub')
+        sub_container.register_callable('a', TestClass1)
+        container.register_callable('a', TestClass2)
+        container.add_sub_container(sub_container)
+
+        a, sub_a, sub_a2 = container.resolve_many(['a', 'sub__a', 'sub__a'], share_instances=True)
+
+        assert isinstance(a, TestClass2)
+        assert isinstance(sub_a, TestClass1)
+        assert sub_a is sub_a2
+
+    def test_if_validate_checks_sub_containers(self):
+        container_class = self.get_container()
+        container = container_class('root')
+        sub_container = SimpleContainer('sub')
+        sub_container.register_callable_with_deps('a', lambda b: b)
+        sub_container.register_callable_with_deps('b', lambda a: a)
+        sub_container.register_callable_with_deps('c', lambda missing: missing)
+        container.add_sub_container(sub_container)
+
+        with pytest.raises(DependencyCycleError):
+            container.validate()
+
+        report = container.validate(raise_errors=False)
+
+        assert report.cycles == [('sub__a', 'b', 'a')]
+        assert report.missing == {'sub__c': ('missing',)}
+
+    def test_if_freezing_namespaced_container_freezes_sub_containers(self):
+        container_class = self.get_container()
+        container = container_class('root')
+        sub_container = SimpleContainer('sub')
+        container.add_sub_container(sub_container)
+        container.freeze()
+
+        with pytest.raises(FrozenContainerError):
+            sub_container.register_object('a', 'a')
+
+        assert sub_container.frozen
+
+    def test_if_frozen_namespaced_container_rejects_sub_containers(self):
+        container_class = self.get_container()
+        container = container_class('root')
+        container.freeze()
+
+        with pytest.raises(FrozenContainerError):
+            container.add_sub_container(SimpleContainer('sub'))
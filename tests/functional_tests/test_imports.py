@@ -0,0 +1,19 @@
+# coding=utf-8
+from __future__ import absolute_import
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.mark.skipif(sys.version_info < (3,), reason='compatibility packages are needed on Python 2')
+def test_if_compatibility_packages_are_not_imported_on_python_3():
+    code = 'import sys, pyioc.containers; print(sorted(m for m in sys.modules if m.split(".")[0] in ("six", "future")))'
+
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=ROOT)
+
+    assert output.strip() == b'[]'
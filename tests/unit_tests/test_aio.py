@@ -0,0 +1,371 @@
+# coding=utf-8
+import asyncio
+import inspect
+
+import pytest
+
+from pyioc.aio import AsyncNewInstancesProvider, AsyncLazySingleInstanceProvider, \
+    AsyncNewInstancesWithDepsProvider, AsyncLazySingleInstanceWithDepsProvider
+from pyioc.locators import ObjectLocator
+from pyioc.containers import SimpleContainer, NamespacedContainer, InstanceLifetime, DisposalTimeoutError, \
+    AsyncResolutionError
+from tests.fakes import TestClass1, TEST_CLASS_1_NAME
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(asyncio.wait_for(coroutine, 1))
+    finally:
+        loop.close()
+
+
+class Test_AsyncResolve(object):
+    @classmethod
+    def container(cls):
+        return SimpleContainer
+
+    def test_register_coroutine_functions_uses_async_providers(self):
+        async def factory():
+            pass
+
+        async def factory_with_deps(a):
+            pass
+
+        locator = ObjectLocator()
+        container = self.container()(locator=locator)
+        container.register_callable('new', factory)
+        container.register_callable('single', factory, lifetime=InstanceLifetime.Singleton)
+        container.register_callable_with_deps('new_deps', factory_with_deps)
+        container.register_callable_with_deps('single_deps', factory_with_deps, lifetime=InstanceLifetime.Singleton)
+
+        assert isinstance(locator.locate('new'), AsyncNewInstancesProvider)
+        assert isinstance(locator.locate('single'), AsyncLazySingleInstanceProvider)
+        assert isinstance(locator.locate('new_deps'), AsyncNewInstancesWithDepsProvider)
+        assert isinstance(locator.locate('single_deps'), AsyncLazySingleInstanceWithDepsProvider)
+
+    def test_if_coroutine_factory_is_awaited(self):
+        async def factory():
+            await asyncio.sleep(0)
+            return TestClass1()
+
+        container = self.container()()
+        container.register_callable(TEST_CLASS_1_NAME, factory)
+
+        ret = run(container.resolve_async(TEST_CLASS_1_NAME))
+
+        assert isinstance(ret, TestClass1)
+
+    def test_if_sync_resolve_of_async_singleton_returns_created_instance(self):
+        async def factory():
+            return TestClass1()
+
+        container = self.container()()
+        container.register_callable(TEST_CLASS_1_NAME, factory, lifetime=InstanceLifetime.Singleton)
+
+        with pytest.raises(AsyncResolutionError):
+            container.resolve(TEST_CLASS_1_NAME)
+
+        ret1 = run(container.resolve_async(TEST_CLASS_1_NAME))
+        ret2 = container.resolve(TEST_CLASS_1_NAME)
+
+        assert isinstance(ret1, TestClass1)
+        assert ret2 is ret1
+
+    def test_if_sync_resolve_injects_created_async_singleton_into_dependencies(self):
+        async def create_pool():
+            return TestClass1()
+
+        class Repository(object):
+            def __init__(self, pool):
+                self.pool = pool
+
+        container = self.container()()
+        container.register_callable('pool', create_pool, lifetime=InstanceLifetime.Singleton)
+        container.register_callable_with_deps('repo', Repository)
+
+        with pytest.raises(AsyncResolutionError):
+            container.resolve('repo')
+
+        pool = run(container.resolve_async('pool'))
+
+        assert container.resolve('repo').pool is pool
+        assert not inspect.isawaitable(container.resolve('repo', {'x': 1}).pool)
+
+    def test_if_sync_resolve_of_per_call_coroutine_factory_raises_error(self):
+        async def factory():
+            return TestClass1()
+
+        async def factory_with_deps(a):
+            return TestClass1()
+
+        container = self.container()()
+        container.register_callable('new', factory)
+        container.register_callable_with_deps('new_deps', factory_with_deps)
+        container.register_object('a', 'a')
+
+        with pytest.raises(AsyncResolutionError):
+            container.resolve('new')
+        with pytest.raises(AsyncResolutionError):
+            container.resolve('new_deps')
+
+    def test_if_concurrent_resolves_of_async_singleton_share_single_construction(self):
+        calls = []
+
+        async def factory():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return TestClass1()
+
+        container = self.container()()
+        container.register_callable(TEST_CLASS_1_NAME, factory, lifetime=InstanceLifetime.Singleton)
+
+        async def resolve_many():
+            return await asyncio.gather(*[container.resolve_async(TEST_CLASS_1_NAME) for _ in range(10)])
+
+        results = run(resolve_many())
+
+        assert len(calls) == 1
+        assert all(ret is results[0] for ret in results)
+
+    def test_if_failed_async_singleton_is_retried(self):
+        calls = []
+
+        async def factory():
+            calls.append(1)
+            if len(calls) == 1:
+                raise ValueError()
+            return TestClass1()
+
+        container = self.container()()
+        container.register_callable(TEST_CLASS_1_NAME, factory, lifetime=InstanceLifetime.Singleton)
+
+        async def resolve_twice():
+            with pytest.raises(ValueError):
+                await container.resolve_async(TEST_CLASS_1_NAME)
+            return await container.resolve_async(TEST_CLASS_1_NAME)
+
+        ret = run(resolve_twice())
+
+        assert isinstance(ret, TestClass1)
+
+    def test_if_dependencies_are_resolved_concurrently(self):
+        class ClassWithDeps(object):
+            def __init__(self, a, b):
+                self.a = a
+                self.b = b
+
+        async def test():
+            event = asyncio.Event()
+
+            async def factory_a():
+                await event.wait()
+                return 'a'
+
+            async def factory_b():
+                event.set()
+                return 'b'
+
+            container = self.container()()
+            container.register_callable('a', factory_a)
+            container.register_callable('b', factory_b)
+            container.register_callable_with_deps('deps', ClassWithDeps)
+
+            return await container.resolve_async('deps')
+
+        ret = run(test())
+
+        assert isinstance(ret, ClassWithDeps)
+        assert ret.a == 'a'
+        assert ret.b == 'b'
+
+    def test_if_async_factory_with_deps_gets_resolved_deps(self):
+        async def factory(a, b):
+            return a, b
+
+        async def factory_b():
+            return 'b'
+
+        container = self.container()()
+        container.register_object('a', 'a')
+        container.register_callable('b', factory_b)
+        container.register_callable_with_deps('deps', factory, lifetime=InstanceLifetime.Singleton)
+
+        ret1 = run(container.resolve_async('deps'))
+        ret2 = run(container.resolve_async('deps'))
+
+        assert ret1 == ('a', 'b')
+        assert ret1 is ret2
+
+    def test_if_context_overrides_dependencies(self):
+        class ClassWithDeps(object):
+            def __init__(self, a):
+                self.a = a
+
+        container = self.container()()
+        container.register_object('a', 'a')
+        container.register_callable_with_deps('deps', ClassWithDeps)
+
+        ret = run(container.resolve_async('deps', context={'a': 'override'}))
+
+        assert ret.a == 'override'
+
+    def test_build_async(self):
+        class ClassWithDeps(object):
+            def __init__(self, a):
+                self.a = a
+
+        async def factory_a():
+            return 'a'
+
+        container = self.container()()
+        container.register_callable('a', factory_a)
+
+        ret = run(container.build_async(ClassWithDeps))
+
+        assert ret.a == 'a'
+
+    def test_if_resolving_unregistered_key_raises_error(self):
+        container = self.container()()
+
+        with pytest.raises(KeyError):
+            run(container.resolve_async('missing'))
+
+    def test_if_profiling_hooks_time_async_resolves(self):
+        async def factory_a():
+            await asyncio.sleep(0.01)
+            return 'a'
+
+        async def factory_b():
+            await asyncio.sleep(0.01)
+            return 'b'
+
+        async def factory(a, b):
+            return a + b
+
+        container = self.container()()
+        container.register_callable('a', factory_a)
+        container.register_callable('b', factory_b)
+        container.register_callable_with_deps('ab', factory)
+        profiler = container.enable_profiling()
+
+        ret = run(container.resolve_async('ab'))
+
+        stats = profiler.stats
+        assert ret == 'ab'
+        assert stats['ab'].count == stats['a'].count == stats['b'].count == 1
+        assert stats['a'].total_time >= 0.01
+        assert set(stats['ab'].dependencies) == {'a', 'b'}
+        assert not stats['a'].dependencies
+
+    def test_if_profiling_hooks_are_not_called_for_async_resolves_when_disabled(self):
+        async def factory():
+            return 'a'
+
+        container = self.container()()
+        container.register_callable('a', factory)
+        profiler = container.enable_profiling()
+        run(container.resolve_async('a'))
+
+        container.disable_profiling()
+        ret = run(container.resolve_async('a'))
+
+        assert ret == 'a'
+        assert profiler.stats['a'].count == 1
+        assert 'resolve_async' not in vars(container)
+
+    def test_if_aclose_disposes_singletons_in_reverse_construction_order(self):
+        closed = []
+
+        class AsyncResource(object):
+            def __init__(self, name):
+                self.name = name
+
+            async def __aexit__(self, *args):
+                await asyncio.sleep(0)
+                closed.append(self.name)
+
+        class SyncResource(object):
+            def close(self):
+                closed.append('sync')
+
+        async def factory_db():
+            return AsyncResource('db')
+
+        async def factory_service(db, sync):
+            return AsyncResource('service')
+
+        container = self.container()()
+        container.register_callable('db', factory_db, lifetime=InstanceLifetime.Singleton)
+        container.register_callable('sync', SyncResource, lifetime=InstanceLifetime.Singleton)
+        container.register_callable_with_deps('service', factory_service, lifetime=InstanceLifetime.Singleton)
+        run(container.resolve_async('service'))
+
+        run(container.aclose())
+
+        assert closed[0] == 'service'
+        assert sorted(closed[1:]) == ['db', 'sync']
+        assert run(container.resolve_async('db')).name == 'db'
+
+    def test_if_aclose_awaits_coroutine_returned_by_close(self):
+        closed = []
+
+        class Client(object):
+            async def close(self):
+                closed.append(self)
+
+        container = self.container()()
+        container.register_callable('client', Client, lifetime=InstanceLifetime.Singleton)
+        client = container.resolve('client')
+
+        run(container.aclose())
+
+        assert closed == [client]
+
+    def test_if_aclose_raises_error_when_closing_is_too_slow(self):
+        class SlowResource(object):
+            async def aclose(self):
+                await asyncio.sleep(5)
+
+        container = self.container()()
+        container.register_callable('slow', SlowResource, lifetime=InstanceLifetime.Singleton)
+        container.resolve('slow')
+
+        with pytest.raises(DisposalTimeoutError):
+            run(container.aclose(timeout=0.01))
+
+
+class Test_AsyncResolveNamespaced(Test_AsyncResolve):
+    @classmethod
+    def container(cls):
+        return NamespacedContainer
+
+    def test_if_namespaced_coroutine_factory_is_awaited(self):
+        async def factory():
+            return TestClass1()
+
+        container = self.container()('root')
+        sub_container = SimpleContainer('sub')
+        sub_container.register_callable(TEST_CLASS_1_NAME, factory)
+        container.add_sub_container(sub_container)
+
+        ret = run(container.resolve_async('sub__%s' % TEST_CLASS_1_NAME))
+
+        assert isinstance(ret, TestClass1)
+
+    def test_if_aclose_disposes_singletons_of_sub_containers(self):
+        closed = []
+
+        class Resource(object):
+            def close(self):
+                closed.append(self)
+
+        container = self.container()('root')
+        sub_container = SimpleContainer('sub')
+        sub_container.register_callable('r', Resource, lifetime=InstanceLifetime.Singleton)
+        container.add_sub_container(sub_container)
+        ret = container.resolve('sub__r')
+
+        run(container.aclose())
+
+        assert closed == [ret]
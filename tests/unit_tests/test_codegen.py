@@ -0,0 +1,74 @@
+# coding=utf-8
+from __future__ import absolute_import
+
+from mock import patch
+
+from pyioc.codegen import generate_factory
+from pyioc.containers import SimpleContainer, InstanceLifetime
+from tests.fakes import TestClass1
+
+
+class Node(object):
+    def __init__(self, child, name='node'):
+        self.child = child
+        self.name = name
+
+
+def _provider(container, key):
+    return container._find_provider(key)
+
+
+class Test_generate_factory(object):
+    def test_if_dependencies_created_per_call_are_inlined(self):
+        container = SimpleContainer()
+        container.register_callable('child', TestClass1)
+        container.register_callable_with_deps('node', Node)
+
+        with patch.object(container, 'get_factory') as get_factory:
+            factory = generate_factory(container, 'node', _provider(container, 'node'))
+            ret = factory()
+
+        assert isinstance(ret, Node)
+        assert isinstance(ret.child, TestClass1)
+        assert not get_factory.called
+
+    def test_if_objects_and_keyword_arguments_are_passed(self):
+        obj = TestClass1()
+        container = SimpleContainer()
+        container.register_object('child', obj)
+        container.register_object('name', 'value')
+        container.register_callable_with_deps('node', lambda child, name='default': Node(child, name=name))
+
+        ret = generate_factory(container, 'node', _provider(container, 'node'))()
+
+        assert ret.child is obj
+        assert ret.name == 'value'
+
+    def test_if_singletons_are_created_by_their_factories(self):
+        container = SimpleContainer()
+        container.register_callable('child', TestClass1, lifetime=InstanceLifetime.Singleton)
+        container.register_callable_with_deps('node', Node)
+        factory = generate_factory(container, 'node', _provider(container, 'node'))
+
+        assert factory().child is factory().child
+
+    def test_if_long_chains_are_split_between_factories(self):
+        container = SimpleContainer()
+        container.register_callable('level0', TestClass1)
+        for level in range(1, 100):
+            container.register_callable_with_deps('level%d' % level, eval('lambda level%d: [level%d]' % (
+                level - 1, level - 1)))
+
+        ret = generate_factory(container, 'level99', _provider(container, 'level99'))()
+
+        for _ in range(99):
+            ret = ret[0]
+        assert isinstance(ret, TestClass1)
+
+    def test_if_unsupported_provider_is_not_generated(self):
+        container = SimpleContainer()
+        container.register_callable('a', TestClass1, lifetime=InstanceLifetime.Singleton)
+        container.register_callable('b', TestClass1)
+
+        assert generate_factory(container, 'a', _provider(container, 'a')) is None
+        assert generate_factory(container, 'b', _provider(container, 'b')) is None
@@ -1,7 +1,9 @@
 # coding=utf-8
+import gc
+import weakref
 
 import pytest
-from mock import Mock
+from mock import Mock, patch
 
 from pyioc.containers import SimpleContainer, NamespacedContainer, NamespaceIdParser, SimpleIdParser, FormatError, \
     InstanceLifetime
@@ -84,6 +86,17 @@ class Test_SimpleContainer(object):
         assert args[0] == 'key'
         assert isinstance(args[1], providers.LazySingleInstanceProvider)
 
+    def test_register_thread_safe_singleton(self, mock_locator):
+        container_class = self.container()
+        container = container_class(locator=mock_locator)
+        container.register_callable('key', TestClass1, lifetime=InstanceLifetime.ThreadSafeSingleton)
+        container.register_callable_with_deps('key2', TestClass1, lifetime=InstanceLifetime.ThreadSafeSingleton)
+
+        args = mock_locator.register.call_args_list[0][0]
+        assert isinstance(args[1], providers.ThreadSafeLazySingleInstanceProvider)
+        args = mock_locator.register.call_args_list[1][0]
+        assert isinstance(args[1], providers.ThreadSafeLazySingleInstanceWithDepsProvider)
+
     def test_register_object(self, mock_locator):
         container_class = self.container()
         container = container_class(locator=mock_locator)
@@ -160,6 +173,66 @@ class Test_SimpleContainer(object):
         assert isinstance(instance, ClassWithDeps)
         assert isinstance(instance.testclass1, TestClass1)
 
+    def test_if_build_computes_dependencies_once_per_class(self):
+        class ClassWithDeps(object):
+            def __init__(self, testclass1):
+                self.testclass1 = testclass1
+
+        container_class = self.container()
+        container = container_class()
+        container.register_callable(TEST_CLASS_1_NAME, TestClass1)
+
+        with patch('pyioc.providers.get_dependency_plan', wraps=providers.get_dependency_plan) as get_plan_mock:
+            ret1 = container.build(ClassWithDeps)
+            ret2 = container.build(ClassWithDeps)
+
+        assert get_plan_mock.call_count == 1
+        assert isinstance(ret1.testclass1, TestClass1)
+        assert ret1 is not ret2
+
+    def test_if_build_cache_does_not_keep_classes_alive(self):
+        class ClassWithDeps(object):
+            def __init__(self, testclass1):
+                self.testclass1 = testclass1
+
+        container_class = self.container()
+        container = container_class()
+        container.register_callable(TEST_CLASS_1_NAME, TestClass1)
+        container.build(ClassWithDeps)
+
+        class_ref = weakref.ref(ClassWithDeps)
+        del ClassWithDeps
+        gc.collect()
+
+        assert class_ref() is None
+
+    def test_if_build_raises_error_for_not_callable(self):
+        container_class = self.container()
+        container = container_class()
+
+        with pytest.raises(TypeError):
+            container.build(1)
+
+    def test_if_invalidate_build_plans_recomputes_dependencies(self):
+        class ClassWithDeps(object):
+            def __init__(self):
+                pass
+
+        container_class = self.container()
+        container = container_class()
+        container.register_callable(TEST_CLASS_1_NAME, TestClass1)
+        container.build(ClassWithDeps)
+
+        def new_init(self, testclass1):
+            self.testclass1 = testclass1
+
+        ClassWithDeps.__init__ = new_init
+        container.invalidate_build_plans()
+
+        ret = container.build(ClassWithDeps)
+
+        assert isinstance(ret.testclass1, TestClass1)
+
     def test_if_container_returns_list_of_registered_objects(self):
         container_class = self.container()
         container = container_class()
@@ -222,3 +295,38 @@ class Test_NamespaceContainer(Test_SimpleContainer):
         assert TEST_CLASS_1_NAME in registered_keys['container']
         assert TEST_CLASS_2_NAME in registered_keys['sub_container']
         assert len(registered_keys) == 2
+
+    def test_if_parsed_keys_are_cached(self):
+        name_resolver = Mock(wraps=NamespaceIdParser())
+        container_class = self.container()
+        container = container_class('container', name_resolver=name_resolver)
+        container.register_object('key', 'value')
+
+        container.resolve('key', context={'other': 1})
+        container.resolve('key', context={'other': 1})
+
+        assert name_resolver.parse.call_count == 1
+
+    def test_if_parse_cache_is_bounded(self):
+        name_resolver = Mock(wraps=NamespaceIdParser())
+        container_class = self.container()
+        container = container_class('container', name_resolver=name_resolver, parse_cache_size=2)
+        for key in ('key1', 'key2', 'key3'):
+            container.register_object(key, 'value')
+
+        for i, key in enumerate(('key1', 'key2', 'key3', 'key1')):
+            container.resolve(key, context={'other%d' % i: 1})
+
+        assert name_resolver.parse.call_count == 4
+
+    def test_if_parse_cache_is_cleared_when_sub_container_added(self):
+        name_resolver = Mock(wraps=NamespaceIdParser())
+        container_class = self.container()
+        container = container_class('container', name_resolver=name_resolver)
+        container.register_object('key', 'value')
+        container.resolve('key', context={'other': 1})
+
+        container.add_sub_container(SimpleContainer(name='sub_container'))
+        container.resolve('key', context={'other': 1})
+
+        assert name_resolver.parse.call_count == 2
@@ -2,8 +2,8 @@
 
 import pytest
 
-from pyioc.locators import ObjectLocator, KeyToStringConverter
-from tests.fakes import TEST_CLASS_1_NAME, TestClass1
+from pyioc.locators import ObjectLocator, KeyToStringConverter, TypeLocator, AmbiguousKeyError, ChildLocator
+from tests.fakes import TEST_CLASS_1_NAME, TestClass1, TestClass2
 
 
 class Test_ObjectLocator(object):
@@ -80,6 +80,128 @@ class Test_ObjectLocator(object):
         assert len(keys) == 1
 
 
+class BaseClass(object):
+    pass
+
+
+class SubClass(BaseClass):
+    pass
+
+
+class SubSubClass(SubClass):
+    pass
+
+
+class OtherSubClass(BaseClass):
+    pass
+
+
+class Test_TypeLocator(object):
+    def test_if_registered_object_is_resolved_by_key(self):
+        locator = TypeLocator()
+        locator.register(TEST_CLASS_1_NAME, 'value')
+
+        assert locator.locate(TEST_CLASS_1_NAME) == 'value'
+
+    def test_if_base_class_is_resolved_to_object_registered_for_subclass(self):
+        locator = TypeLocator()
+        locator.register(SubSubClass, 'value')
+
+        assert locator.locate(SubSubClass) == 'value'
+        assert locator.locate(SubClass) == 'value'
+        assert locator.locate(BaseClass) == 'value'
+        assert locator.is_key_registered(BaseClass)
+        assert locator.get_or_default(BaseClass, 'default') == 'value'
+
+    def test_if_exact_registration_has_priority_over_subclass(self):
+        locator = TypeLocator()
+        locator.register(SubClass, 'sub')
+        locator.register(BaseClass, 'base')
+
+        assert locator.locate(BaseClass) == 'base'
+        assert locator.locate(SubClass) == 'sub'
+
+    def test_if_locating_base_class_with_many_subclasses_raises_error(self):
+        locator = TypeLocator()
+        locator.register(SubClass, 'sub')
+        locator.register(OtherSubClass, 'other')
+
+        with pytest.raises(AmbiguousKeyError):
+            locator.locate(BaseClass)
+
+        assert locator.locate(SubClass) == 'sub'
+
+    def test_if_ambiguous_base_class_is_registered_but_has_no_single_object(self):
+        locator = TypeLocator()
+        locator.register(SubClass, 'sub')
+        locator.register(OtherSubClass, 'other')
+
+        assert locator.get_or_default(BaseClass, 'default') == 'default'
+        assert locator.is_key_registered(BaseClass)
+
+    def test_if_subclass_is_not_resolved_for_base_class_registration(self):
+        locator = TypeLocator()
+        locator.register(BaseClass, 'base')
+
+        with pytest.raises(KeyError):
+            locator.locate(SubClass)
+
+    def test_if_object_is_not_resolved_for_unrelated_class(self):
+        locator = TypeLocator()
+        locator.register(TestClass1, 'value')
+
+        with pytest.raises(KeyError):
+            locator.locate(TestClass2)
+
+        assert locator.get_or_default(object, 'default') == 'default'
+
+
+class Test_ChildLocator(object):
+    def test_if_parent_objects_are_located(self):
+        parent = ObjectLocator()
+        parent.register('key', 'value')
+        locator = ChildLocator(parent)
+
+        assert locator.locate('key') == 'value'
+        assert locator.is_key_registered('key')
+        assert locator.get_keys() == ['key']
+        assert locator.get_own_keys() == []
+
+    def test_if_registered_object_overrides_parent_object(self):
+        parent = ObjectLocator()
+        parent.register('key', 'parent')
+        locator = ChildLocator(parent)
+        locator.locate('key')
+
+        locator.register('key', 'child')
+
+        assert locator.locate('key') == 'child'
+        assert parent.locate('key') == 'parent'
+        assert locator.get_keys() == ['key']
+
+    def test_if_parent_objects_are_cached_until_cache_is_cleared(self):
+        grandparent = ObjectLocator()
+        grandparent.register('key', 'value')
+        parent = ChildLocator(grandparent)
+        locator = ChildLocator(parent)
+        locator.locate('key')
+        parent.register('key', 'new')
+
+        assert locator.locate('key') == 'value'
+
+        locator.clear_cache()
+
+        assert locator.locate('key') == 'new'
+
+    def test_if_unregistered_key_raises_error(self):
+        locator = ChildLocator(ObjectLocator())
+
+        with pytest.raises(KeyError):
+            locator.locate('key')
+
+        assert locator.get_or_default('key', 'default') == 'default'
+
+
 class Test_KeyToStringConverter(object):
     def test_func_name(self):
         converter = KeyToStringConverter()
@@ -0,0 +1,85 @@
+# coding=utf-8
+from __future__ import absolute_import
+
+import pytest
+from mock import Mock, patch
+
+from pyioc.profiling import ResolutionHooks, ResolutionProfiler, profile_factory
+
+
+class Test_ResolutionProfiler(object):
+    def test_if_stats_are_collected_per_key(self):
+        profiler = ResolutionProfiler()
+
+        profiler.before_get_instance('a', None)
+        profiler.after_get_instance('a', None, 2.0)
+        profiler.before_get_instance('a', None)
+        profiler.after_get_instance('a', None, 1.0)
+
+        stats = profiler.stats['a']
+        assert stats.count == 2
+        assert stats.total_time == 3.0
+        assert stats.self_time == 3.0
+        assert stats.max_time == 2.0
+
+    def test_if_dependency_time_is_attributed_to_parent(self):
+        profiler = ResolutionProfiler()
+
+        profiler.before_get_instance('parent', None)
+        profiler.before_get_instance('child', None)
+        profiler.after_get_instance('child', None, 1.0)
+        profiler.after_get_instance('parent', None, 3.0)
+
+        parent = profiler.stats['parent']
+        assert parent.total_time == 3.0
+        assert parent.self_time == 2.0
+        assert parent.dependencies == {'child': 1.0}
+        assert profiler.stats['child'].dependencies == {}
+
+    def test_if_report_lists_keys_and_dependencies(self):
+        profiler = ResolutionProfiler()
+        profiler.before_get_instance('parent', None)
+        profiler.before_get_instance('child', None)
+        profiler.after_get_instance('child', None, 1.0)
+        profiler.after_get_instance('parent', None, 3.0)
+
+        lines = profiler.report().splitlines()
+
+        assert len(lines) == 4
+        assert lines[1].startswith('parent')
+        assert lines[2].strip().startswith('child')
+        assert lines[3].startswith('child')
+        assert len(profiler.report(limit=1).splitlines()) == 3
+
+    def test_if_reset_drops_stats(self):
+        profiler = ResolutionProfiler()
+        profiler.before_get_instance('a', None)
+        profiler.after_get_instance('a', None, 1.0)
+
+        profiler.reset()
+
+        assert profiler.stats == {}
+
+
+class Test_profile_factory(object):
+    def test_if_hooks_are_called_around_factory(self):
+        hooks = Mock(spec=ResolutionHooks)
+        provider = object()
+
+        with patch('pyioc.profiling.default_timer', side_effect=[1.0, 3.0]):
+            ret = profile_factory('key', provider, lambda: 'value', hooks)()
+
+        assert ret == 'value'
+        hooks.before_get_instance.assert_called_once_with('key', provider)
+        hooks.after_get_instance.assert_called_once_with('key', provider, 2.0)
+
+    def test_if_after_hook_is_called_when_factory_fails(self):
+        hooks = Mock(spec=ResolutionHooks)
+
+        def factory():
+            raise ValueError()
+
+        with pytest.raises(ValueError):
+            profile_factory('key', None, factory, hooks)()
+
+        assert hooks.after_get_instance.call_count == 1
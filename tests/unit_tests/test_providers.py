@@ -1,11 +1,19 @@
 # coding=utf-8
 from __future__ import absolute_import
 
+import gc
+import threading
+import time
+
 import pytest
+from mock import patch
 
 from pyioc.providers import validate_if_callable_without_args, SignatureError, ObjectProvider, NewInstancesProvider, \
     LazySingleInstanceProvider, LazySingleInstanceWithDepsProvider, NewInstancesWithDepsProvider, \
-    EagerSingleInstanceProvider
+    EagerSingleInstanceProvider, ThreadSafeLazySingleInstanceProvider, ThreadSafeLazySingleInstanceWithDepsProvider, \
+    ScopedProvider, ScopedWithDepsProvider, MultiProvider, WeakSingleInstanceProvider, \
+    WeakSingleInstanceWithDepsProvider, TTLSingleInstanceProvider, TTLSingleInstanceWithDepsProvider
+from pyioc.scopes import Scope, ScopeError
 from tests.fakes import TestClass1, TEST_CLASS_1_INSTANCE
 
 
@@ -126,6 +134,34 @@ class Test_LazySingletonProvider(object):
         assert isinstance(ret2, TestClass1)
         assert ret1 is ret2
 
+    @pytest.mark.parametrize('value', [None, 0, '', {}, []])
+    def test_if_falsy_instance_is_created_once(self, value):
+        calls = []
+
+        def factory():
+            calls.append(1)
+            return value
+
+        provider = LazySingleInstanceProvider(factory)
+        ret1 = provider.get_instance()
+        ret2 = provider.get_instance()
+
+        assert ret1 == value
+        assert ret1 is ret2
+        assert len(calls) == 1
+
+    def test_if_instance_with_zero_length_is_created_once(self):
+        class EmptyPool(object):
+            def __len__(self):
+                return 0
+
+        provider = LazySingleInstanceProvider(EmptyPool)
+        ret1 = provider.get_instance()
+        ret2 = provider.get_instance()
+
+        assert isinstance(ret1, EmptyPool)
+        assert ret1 is ret2
+
     def test_if_provider_raise_error_when_callable_requires_arguments(self):
         def func1(a):
             return a
@@ -137,6 +173,98 @@ class Test_LazySingletonProvider(object):
         with pytest.raises(TypeError):
             LazySingleInstanceProvider(1)
 
+    def test_if_released_instance_is_created_again(self):
+        provider = LazySingleInstanceProvider(TestClass1)
+        ret1 = provider.get_instance()
+        order = provider.construction_order
+
+        assert provider.release() is ret1
+        assert provider.construction_order is None
+        assert provider.release() is None
+
+        ret2 = provider.get_instance()
+
+        assert ret2 is not ret1
+        assert provider.construction_order > order
+
+
+def _get_instances_from_threads(provider, count=10):
+    results = []
+
+    def get_instance():
+        results.append(provider.get_instance())
+
+    threads = [threading.Thread(target=get_instance) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return results
+
+
+class Test_ThreadSafeLazySingleInstanceProvider(object):
+    def test_if_object_provider_always_return_same_instance(self):
+        provider = ThreadSafeLazySingleInstanceProvider(TestClass1)
+        ret1 = provider.get_instance()
+        ret2 = provider.get_instance()
+
+        assert isinstance(ret1, TestClass1)
+        assert ret1 is ret2
+
+    def test_if_instance_is_created_once_when_accessed_from_many_threads(self):
+        calls = []
+
+        def slow_factory():
+            calls.append(1)
+            time.sleep(0.01)
+            return TestClass1()
+
+        provider = ThreadSafeLazySingleInstanceProvider(slow_factory)
+
+        results = _get_instances_from_threads(provider)
+
+        assert len(calls) == 1
+        assert all(ret is results[0] for ret in results)
+
+    def test_if_provider_raise_error_when_callable_requires_arguments(self):
+        def func1(a):
+            return a
+
+        with pytest.raises(TypeError):
+            ThreadSafeLazySingleInstanceProvider(func1)
+
+
+class Test_ScopedProvider(object):
+    def test_if_provider_returns_same_instance_in_scope(self, mock_container):
+        provider = ScopedProvider(TestClass1)
+        scope1 = Scope(mock_container)
+        scope2 = Scope(mock_container)
+
+        ret1 = provider.get_instance(scope1)
+        ret2 = provider.get_instance(scope1)
+        ret3 = provider.get_instance(scope2)
+
+        assert isinstance(ret1, TestClass1)
+        assert ret1 is ret2
+        assert ret1 is not ret3
+
+    def test_if_provider_raise_error_outside_scope(self):
+        provider = ScopedProvider(TestClass1)
+
+        with pytest.raises(ScopeError):
+            provider.get_instance()
+
+        with pytest.raises(ScopeError):
+            provider.get_instance({})
+
+    def test_if_provider_raise_error_when_callable_requires_arguments(self):
+        def func1(a):
+            return a
+
+        with pytest.raises(TypeError):
+            ScopedProvider(func1)
+
 
 class Test_EagerSingleInstanceProvider(object):
     def test_if_single_instance_provider_returns_instance(self):
@@ -159,6 +287,26 @@ class Test_EagerSingleInstanceProvider(object):
         with pytest.raises(TypeError):
             EagerSingleInstanceProvider(1)
 
+    def test_if_released_instance_is_created_again_on_next_call(self):
+        calls = []
+
+        def factory():
+            calls.append(1)
+            return TestClass1()
+
+        provider = EagerSingleInstanceProvider(factory)
+        ret1 = provider.get_instance()
+
+        assert provider.construction_order is not None
+        assert provider.release() is ret1
+        assert len(calls) == 1
+
+        ret2 = provider.get_factory()()
+
+        assert ret2 is not ret1
+        assert provider.get_factory()() is ret2
+        assert len(calls) == 2
+
 
 class Test_NewInstancesWithDepsProvider(object):
     def test_if_returns_new_instance_of_a_class(self, mock_container):
@@ -204,6 +352,39 @@ class Test_NewInstancesWithDepsProvider(object):
         with pytest.raises(TypeError):
             NewInstancesWithDepsProvider(1, mock_container)
 
+    def test_if_provider_computes_dependencies_once(self, mock_container):
+        class ClassWIthDeps(object):
+            def __init__(self, testclass1):
+                self.testclass1 = testclass1
+
+        provider = NewInstancesWithDepsProvider(ClassWIthDeps, mock_container)
+
+        with patch('pyioc.providers.get_dependency_plan') as get_plan_mock:
+            provider.get_instance()
+            provider.get_instance()
+
+        assert provider.dependencies == ('testclass1',)
+        assert not get_plan_mock.called
+
+    def test_if_invalidate_recomputes_dependencies(self, mock_container):
+        class ClassWIthDeps(object):
+            def __init__(self):
+                pass
+
+        provider = NewInstancesWithDepsProvider(ClassWIthDeps, mock_container)
+        assert provider.dependencies == ()
+
+        def new_init(self, testclass1):
+            self.testclass1 = testclass1
+
+        ClassWIthDeps.__init__ = new_init
+        provider.invalidate()
+
+        ret1 = provider.get_instance()
+
+        assert provider.dependencies == ('testclass1',)
+        assert isinstance(ret1.testclass1, TestClass1)
+
 
 class Test_LazySingleInstanceWithDepsProvider(object):
     class ClassWIthDeps(object):
@@ -240,3 +421,294 @@ class Test_LazySingleInstanceWithDepsProvider(object):
     def test_if_provider_raise_error_when_initialized_with_not_callable(self, mock_container):
         with pytest.raises(TypeError):
             LazySingleInstanceWithDepsProvider(1, mock_container)
+
+    @pytest.mark.parametrize('value', [None, 0, '', {}, []])
+    def test_if_falsy_instance_is_created_once(self, mock_container, value):
+        calls = []
+
+        def factory(testclass1):
+            calls.append(testclass1)
+            return value
+
+        provider = LazySingleInstanceWithDepsProvider(factory, mock_container)
+        ret1 = provider.get_instance()
+        ret2 = provider.get_instance()
+
+        assert ret1 == value
+        assert ret1 is ret2
+        assert len(calls) == 1
+
+
+class Test_ThreadSafeLazySingleInstanceWithDepsProvider(object):
+    def test_if_instance_is_created_once_when_accessed_from_many_threads(self, mock_container):
+        calls = []
+
+        def slow_factory(testclass1):
+            calls.append(1)
+            time.sleep(0.01)
+            return [testclass1]
+
+        provider = ThreadSafeLazySingleInstanceWithDepsProvider(slow_factory, mock_container)
+
+        results = _get_instances_from_threads(provider)
+
+        assert len(calls) == 1
+        assert all(ret is results[0] for ret in results)
+        assert isinstance(results[0][0], TestClass1)
+
+    def test_if_provider_raise_error_when_initialized_with_not_callable(self, mock_container):
+        with pytest.raises(TypeError):
+            ThreadSafeLazySingleInstanceWithDepsProvider(1, mock_container)
+
+
+class Test_ScopedWithDepsProvider(object):
+    def test_if_provider_returns_same_instance_in_scope(self, mock_container):
+        def func_with_deps(testclass1):
+            return [testclass1]
+
+        provider = ScopedWithDepsProvider(func_with_deps, mock_container)
+        scope1 = Scope(mock_container)
+        scope2 = Scope(mock_container)
+
+        ret1 = provider.get_instance(scope1)
+        ret2 = provider.get_instance(scope1)
+        ret3 = provider.get_instance(scope2)
+
+        assert isinstance(ret1[0], TestClass1)
+        assert ret1 is ret2
+        assert ret1 is not ret3
+
+    def test_if_provider_raise_error_outside_scope(self, mock_container):
+        provider = ScopedWithDepsProvider(TestClass1, mock_container)
+
+        with pytest.raises(ScopeError):
+            provider.get_instance()
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    fake_clock = FakeClock()
+    with patch('pyioc.providers.default_timer', fake_clock):
+        yield fake_clock
+
+
+class Test_WeakSingleInstanceProvider(object):
+    def test_if_returns_same_instance_while_it_is_alive(self):
+        provider = WeakSingleInstanceProvider(TestClass1)
+
+        ret1 = provider.get_instance()
+        ret2 = provider.get_instance()
+
+        assert isinstance(ret1, TestClass1)
+        assert ret1 is ret2
+        assert provider.is_created
+
+    def test_if_creates_new_instance_after_it_was_collected(self):
+        calls = []
+
+        def factory():
+            calls.append(1)
+            return TestClass1()
+
+        provider = WeakSingleInstanceProvider(factory)
+        provider.get_instance()
+        gc.collect()
+
+        assert not provider.is_created
+
+        ret = provider.get_instance()
+
+        assert isinstance(ret, TestClass1)
+        assert len(calls) == 2
+
+    def test_if_provider_raise_error_when_callable_requires_arguments(self):
+        with pytest.raises(TypeError):
+            WeakSingleInstanceProvider(lambda a: a)
+
+    def test_if_release_returns_alive_instance(self):
+        provider = WeakSingleInstanceProvider(TestClass1)
+        ret = provider.get_instance()
+
+        assert provider.release() is ret
+        assert not provider.is_created
+        assert provider.construction_order is None
+        assert provider.get_instance() is not ret
+
+    def test_if_raises_error_for_instance_without_weak_references(self):
+        calls = []
+
+        def factory():
+            calls.append(1)
+            return {}
+
+        provider = WeakSingleInstanceProvider(factory, 'settings')
+
+        with pytest.raises(TypeError) as error:
+            provider.get_instance()
+
+        assert 'settings' in str(error.value)
+        assert 'WeakSingleton' in str(error.value)
+        assert not provider.is_created
+        assert len(calls) == 1
+
+
+class Test_WeakSingleInstanceWithDepsProvider(object):
+    def test_if_provider_injects_deps_and_rebuilds_collected_instance(self, mock_container):
+        class ClassWithDeps(object):
+            def __init__(self, testclass1):
+                self.testclass1 = testclass1
+
+        provider = WeakSingleInstanceWithDepsProvider(ClassWithDeps, mock_container)
+
+        ret1 = provider.get_instance()
+        ret2 = provider.get_instance()
+        assert ret1 is ret2
+        del ret1, ret2
+        gc.collect()
+
+        assert not provider.is_created
+        assert isinstance(provider.get_instance().testclass1, TestClass1)
+
+    def test_if_create_instance_returns_alive_instance(self, mock_container):
+        provider = WeakSingleInstanceWithDepsProvider(TestClass1, mock_container)
+
+        ret = provider.get_instance()
+
+        assert provider.create_instance(()) is ret
+
+
+class Test_TTLSingleInstanceProvider(object):
+    def test_if_release_drops_instance_before_it_expires(self, clock):
+        provider = TTLSingleInstanceProvider(TestClass1, 10)
+        ret = provider.get_instance()
+
+        assert provider.release() is ret
+        assert provider.construction_order is None
+        assert provider.get_instance() is not ret
+
+    def test_if_returns_same_instance_until_it_expires(self, clock):
+        provider = TTLSingleInstanceProvider(TestClass1, 10)
+
+        ret1 = provider.get_instance()
+        clock.now = 9
+        ret2 = provider.get_instance()
+        clock.now = 10
+        ret3 = provider.get_instance()
+
+        assert ret1 is ret2
+        assert ret3 is not ret1
+        assert isinstance(ret3, TestClass1)
+
+    def test_if_expired_instance_is_refreshed_in_background(self, clock):
+        created = threading.Event()
+        release = threading.Event()
+        instances = []
+
+        def factory():
+            if instances:
+                created.set()
+                release.wait(5)
+            instances.append(TestClass1())
+            return instances[-1]
+
+        provider = TTLSingleInstanceProvider(factory, 10, refresh_in_background=True)
+        ret1 = provider.get_instance()
+        clock.now = 10
+
+        ret2 = provider.get_instance()
+        assert created.wait(5)
+        ret3 = provider.get_instance()
+        release.set()
+        for _ in range(500):
+            if provider.is_created:
+                break
+            time.sleep(0.01)
+
+        assert ret1 is ret2 is ret3
+        assert provider.get_instance() is instances[1]
+        assert len(instances) == 2
+
+    def test_if_failed_refresh_keeps_expired_instance(self, clock):
+        instances = []
+
+        def factory():
+            if instances:
+                raise ValueError()
+            instances.append(TestClass1())
+            return instances[0]
+
+        provider = TTLSingleInstanceProvider(factory, 10, refresh_in_background=True)
+        provider.get_instance()
+        clock.now = 10
+
+        for _ in range(3):
+            assert provider.get_instance() is instances[0]
+
+    @pytest.mark.parametrize('seconds', [0, -1])
+    def test_if_provider_raise_error_when_seconds_are_not_positive(self, seconds):
+        with pytest.raises(ValueError):
+            TTLSingleInstanceProvider(TestClass1, seconds)
+
+
+class Test_TTLSingleInstanceWithDepsProvider(object):
+    def test_if_provider_injects_deps_and_rebuilds_expired_instance(self, mock_container, clock):
+        def func_with_deps(testclass1):
+            return [testclass1]
+
+        provider = TTLSingleInstanceWithDepsProvider(func_with_deps, mock_container, 5)
+
+        ret1 = provider.get_instance()
+        ret2 = provider.get_instance()
+        clock.now = 5
+        ret3 = provider.get_instance()
+
+        assert isinstance(ret1[0], TestClass1)
+        assert ret1 is ret2
+        assert ret3 is not ret1
+        assert provider.create_instance(()) is ret3
+
+
+class Test_MultiProvider(object):
+    def test_if_provider_returns_instances_of_all_members(self):
+        provider = MultiProvider([ObjectProvider(TEST_CLASS_1_INSTANCE), NewInstancesProvider(TestClass1)])
+        provider.add(LazySingleInstanceProvider(TestClass1))
+
+        ret = provider.get_instance()
+
+        assert isinstance(ret, tuple)
+        assert len(ret) == 3
+        assert ret[0] is TEST_CLASS_1_INSTANCE
+        assert all(isinstance(instance, TestClass1) for instance in ret)
+
+    def test_if_instances_are_cached_when_all_members_return_same_instance(self):
+        provider = MultiProvider([ObjectProvider(TEST_CLASS_1_INSTANCE), LazySingleInstanceProvider(TestClass1)])
+
+        ret1 = provider.get_instance()
+        ret2 = provider.get_instance()
+
+        assert ret1 is ret2
+
+    def test_if_instances_are_not_cached_with_per_call_members(self):
+        provider = MultiProvider([ObjectProvider(TEST_CLASS_1_INSTANCE), NewInstancesProvider(TestClass1)])
+
+        ret1 = provider.get_instance()
+        ret2 = provider.get_instance()
+
+        assert ret1[0] is ret2[0]
+        assert ret1[1] is not ret2[1]
+
+    def test_if_adding_member_drops_cached_instances(self):
+        provider = MultiProvider([ObjectProvider(TEST_CLASS_1_INSTANCE)])
+        provider.get_instance()
+
+        provider.add(ObjectProvider(TEST_CLASS_1_INSTANCE))
+
+        assert len(provider.get_instance()) == 2
@@ -0,0 +1,81 @@
+# coding=utf-8
+import pytest
+from mock import Mock
+
+from pyioc.scopes import Scope
+from tests.fakes import TestClass1
+
+
+class Test_Scope(object):
+    def test_if_resolve_passes_scope_as_context(self, mock_container):
+        scope = Scope(mock_container)
+
+        scope.resolve('testclass1')
+
+        mock_container.resolve.assert_called_once_with('testclass1', scope)
+
+    def test_if_scope_contains_context_overrides(self, mock_container):
+        scope = Scope(mock_container, {'key': 'value'})
+
+        assert scope['key'] == 'value'
+
+    def test_if_empty_scope_is_falsy(self, mock_container):
+        scope = Scope(mock_container)
+
+        assert not scope
+
+    def test_if_get_or_create_creates_instance_once_per_provider(self, mock_container):
+        provider1 = object()
+        provider2 = object()
+        scope = Scope(mock_container)
+
+        ret1 = scope.get_or_create(provider1, TestClass1)
+        ret2 = scope.get_or_create(provider1, TestClass1)
+        ret3 = scope.get_or_create(provider2, TestClass1)
+
+        assert ret1 is ret2
+        assert ret1 is not ret3
+
+    def test_if_close_disposes_instances_in_reverse_order(self, mock_container):
+        closed = []
+        instance1 = Mock()
+        instance1.close.side_effect = lambda: closed.append(1)
+        instance2 = Mock()
+        instance2.close.side_effect = lambda: closed.append(2)
+
+        with Scope(mock_container) as scope:
+            scope.get_or_create(object(), lambda: instance1)
+            scope.get_or_create(object(), lambda: instance2)
+            scope.get_or_create(object(), TestClass1)
+
+        assert closed == [2, 1]
+
+    def test_if_close_disposes_all_instances_when_one_fails(self, mock_container):
+        instance1 = Mock()
+        instance2 = Mock()
+        instance2.close.side_effect = ValueError()
+        scope = Scope(mock_container)
+        scope.get_or_create(object(), lambda: instance1)
+        scope.get_or_create(object(), lambda: instance2)
+
+        with pytest.raises(ValueError):
+            scope.close()
+
+        assert instance1.close.called
+
+    def test_if_close_exits_context_managers_without_close_method(self, mock_container):
+        exited = []
+
+        class Resource(object):
+            def __enter__(self):
+                return self
+
+            def __exit__(self, exc_type, exc_val, exc_tb):
+                exited.append((exc_type, exc_val, exc_tb))
+
+        scope = Scope(mock_container)
+        scope.get_or_create(object(), Resource)
+
+        scope.close()
+
+        assert exited == [(None, None, None)]
@@ -0,0 +1,264 @@
+# coding=utf-8
+from __future__ import annotations
+
+import sys
+
+import pytest
+from mock import patch
+
+from pyioc.containers import SimpleContainer, InstanceLifetime
+from pyioc.locators import TypeLocator, AmbiguousKeyError
+from pyioc.providers import get_dependency_plan, Dependency
+from tests.fakes import TestClass1, TestClass2
+
+
+class ClassWithKeywordOnlyArgs(object):
+    def __init__(self, a, *, b):
+        self.a = a
+        self.b = b
+
+
+class ClassWithDefaults(object):
+    def __init__(self, a, b='default', c=None):
+        self.a = a
+        self.b = b
+        self.c = c
+
+
+class ClassWithAnnotations(object):
+    def __init__(self, service: TestClass1, name='name'):
+        self.service = service
+        self.name = name
+
+
+class BaseClass(object):
+    pass
+
+
+class SubClass(BaseClass):
+    pass
+
+
+class OtherSubClass(BaseClass):
+    pass
+
+
+class ClassWithOptionalBase(object):
+    def __init__(self, dep: BaseClass = None):
+        self.dep = dep
+
+
+class ClassWithRequiredBase(object):
+    def __init__(self, dep: BaseClass):
+        self.dep = dep
+
+
+def func_with_var_args(a, *args, **kwargs):
+    return a, args, kwargs
+
+
+def positional_only_func():
+    # positional-only parameters are a syntax error before Python 3.8
+    namespace = {}
+    exec('def func(a=1, b=2, /, c=3):\n    return a, b, c\n', namespace)
+    return namespace['func']
+
+
+positional_only = pytest.mark.skipif(sys.version_info < (3, 8), reason='positional-only parameters need Python 3.8')
+
+
+class Test_get_dependency_plan(object):
+    def test_if_plan_of_class_skips_self(self):
+        plan = get_dependency_plan(ClassWithKeywordOnlyArgs)
+
+        assert plan.names == ('a', 'b')
+
+    def test_if_keyword_only_args_are_passed_as_keywords(self):
+        plan = get_dependency_plan(ClassWithKeywordOnlyArgs)
+
+        assert plan.dependencies == (Dependency('a', ('a',), False, False), Dependency('b', ('b',), True, False))
+        assert plan.keys is None
+
+    def test_if_args_after_default_are_passed_as_keywords(self):
+        plan = get_dependency_plan(ClassWithDefaults)
+
+        assert plan.dependencies == (
+            Dependency('a', ('a',), False, False),
+            Dependency('b', ('b',), True, True),
+            Dependency('c', ('c',), True, True),
+        )
+
+    def test_if_annotation_is_used_as_additional_key(self):
+        plan = get_dependency_plan(ClassWithAnnotations)
+
+        assert plan.dependencies[0] == Dependency('service', ('service', TestClass1), False, False)
+
+    def test_if_var_args_are_skipped(self):
+        plan = get_dependency_plan(func_with_var_args)
+
+        assert plan.names == ('a',)
+        assert plan.keys == ('a',)
+
+    def test_if_plan_of_class_without_init_is_empty(self):
+        plan = get_dependency_plan(TestClass1)
+
+        assert plan.names == ()
+        assert plan.keys == ()
+
+
+class Test_SignatureInjection(object):
+    @staticmethod
+    @pytest.fixture(params=[False, True])
+    def compiled(request):
+        return request.param
+
+    @staticmethod
+    def resolve(container, key, compiled):
+        if compiled:
+            container.compile()
+            return container.resolve(key)
+        return container.resolve(key, context={'unused': None})
+
+    def test_if_keyword_only_args_are_injected(self, compiled):
+        container = SimpleContainer()
+        container.register_object('a', 'a')
+        container.register_object('b', 'b')
+        container.register_callable_with_deps('key', ClassWithKeywordOnlyArgs)
+
+        ret = self.resolve(container, 'key', compiled)
+
+        assert ret.a == 'a'
+        assert ret.b == 'b'
+
+    def test_if_defaults_are_used_for_unregistered_args(self, compiled):
+        container = SimpleContainer()
+        container.register_object('a', 'a')
+        container.register_object('c', 'c')
+        container.register_callable_with_deps('key', ClassWithDefaults)
+
+        ret = self.resolve(container, 'key', compiled)
+
+        assert ret.a == 'a'
+        assert ret.b == 'default'
+        assert ret.c == 'c'
+
+    def test_if_missing_required_arg_raises_error(self, compiled):
+        container = SimpleContainer()
+        container.register_callable_with_deps('key', ClassWithDefaults)
+
+        with pytest.raises(KeyError):
+            self.resolve(container, 'key', compiled)
+
+    def test_if_args_are_resolved_by_annotation(self, compiled):
+        container = SimpleContainer()
+        container.register_callable(TestClass1, TestClass1)
+        container.register_callable_with_deps('key', ClassWithAnnotations)
+
+        ret = self.resolve(container, 'key', compiled)
+
+        assert isinstance(ret.service, TestClass1)
+        assert ret.name == 'name'
+
+    def test_if_name_has_priority_over_annotation(self, compiled):
+        container = SimpleContainer()
+        container.register_callable(TestClass1, TestClass1)
+        container.register_callable('service', TestClass2)
+        container.register_callable_with_deps('key', ClassWithAnnotations)
+
+        ret = self.resolve(container, 'key', compiled)
+
+        assert isinstance(ret.service, TestClass2)
+
+    def test_if_context_provides_value_for_arg_with_default(self):
+        container = SimpleContainer()
+        container.register_object('a', 'a')
+        container.register_callable_with_deps('key', ClassWithDefaults, lifetime=InstanceLifetime.NewInstancePerCall)
+
+        ret = container.resolve('key', context={'b': 'override'})
+
+        assert ret.b == 'override'
+
+    def test_build_with_defaults_and_annotations(self):
+        container = SimpleContainer()
+        container.register_callable(TestClass1, TestClass1)
+
+        ret = container.build(ClassWithAnnotations)
+
+        assert isinstance(ret.service, TestClass1)
+        assert ret.name == 'name'
+
+    def test_resolve_many_with_keyword_only_args(self):
+        container = SimpleContainer()
+        container.register_object('a', 'a')
+        container.register_callable('b', TestClass1)
+        container.register_callable_with_deps('key', ClassWithKeywordOnlyArgs)
+
+        ret, b = container.resolve_many(['key', 'b'], share_instances=True)
+
+        assert ret.b is b
+
+    @positional_only
+    def test_if_defaults_of_skipped_positional_only_args_are_passed(self, compiled):
+        func = positional_only_func()
+        container = SimpleContainer(codegen=compiled)
+        container.register_object('b', 'B')
+        container.register_callable_with_deps('key', func)
+
+        assert self.resolve(container, 'key', compiled) == (1, 'B', 3)
+        assert container.build(func) == (1, 'B', 3)
+        assert container.resolve_many(['key'], share_instances=True) == ((1, 'B', 3),)
+
+    @positional_only
+    def test_if_trailing_positional_only_args_are_skipped(self, compiled):
+        func = positional_only_func()
+        container = SimpleContainer(codegen=compiled)
+        container.register_object('a', 'A')
+        container.register_object('c', 'C')
+        container.register_callable_with_deps('key', func)
+
+        assert self.resolve(container, 'key', compiled) == ('A', 2, 'C')
+
+    def test_if_selection_without_context_is_probed_once(self):
+        container = SimpleContainer()
+        container.register_callable(TestClass1, TestClass1)
+        container.build(ClassWithAnnotations)
+
+        with patch.object(SimpleContainer, 'is_resolvable') as is_resolvable_mock:
+            ret = container.build(ClassWithAnnotations)
+
+        assert isinstance(ret.service, TestClass1)
+        assert not is_resolvable_mock.called
+
+    def test_if_cached_selection_is_dropped_on_register(self):
+        container = SimpleContainer()
+        container.register_callable(TestClass1, TestClass1)
+        container.build(ClassWithAnnotations)
+        container.register_object('name', 'registered')
+
+        ret = container.build(ClassWithAnnotations)
+
+        assert ret.name == 'registered'
+
+    def test_if_ambiguous_annotation_of_optional_arg_uses_default(self):
+        container = SimpleContainer(locator=TypeLocator())
+        container.register_callable(SubClass, SubClass)
+        container.register_callable(OtherSubClass, OtherSubClass)
+
+        assert get_dependency_plan(ClassWithOptionalBase).dependencies[0].keys == ('dep', BaseClass)
+
+        ret = container.build(ClassWithOptionalBase)
+
+        assert ret.dep is None
+
+    def test_if_ambiguous_annotation_of_required_arg_raises_error(self):
+        container = SimpleContainer(locator=TypeLocator())
+        container.register_callable(SubClass, SubClass)
+        container.register_callable(OtherSubClass, OtherSubClass)
+        container.register_callable_with_deps('service', ClassWithRequiredBase)
+
+        with pytest.raises(AmbiguousKeyError):
+            container.build(ClassWithRequiredBase)
+        with pytest.raises(AmbiguousKeyError):
+            container.resolve('service')
+        with pytest.raises(AmbiguousKeyError):
+            container.validate()